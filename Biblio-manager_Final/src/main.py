@@ -4,41 +4,101 @@ Gère la gestion complète d'une bibliothèque (livres, utilisateurs, emprunts,
 """
 
 import os
-
-from rpds import List
-from services.gestion_livre import GestionLivre
-from services.gestion_user import GestionUtilisateur as GestionUser
-from services.gestion_emprunt import ExemplaireIndisponible, GestionEmprunt, LimiteAtteinte, EmpruntError, EmpruntNonTrouve
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
+from typing import Callable, Dict, List, Optional
+
+from services.gestion_emprunt import ExemplaireIndisponible, LimiteAtteinte, EmpruntError, EmpruntNonTrouve
 from models.exemplaire import Exemplaire
 from models.livre import Livre
 from models.enums import CategorieLivre, TypeUtilisateur
-import random
-from services.gestion_reservation import GestionReservation
-from services.statistiques import Statistiques
-from services.journal import enregistrer_action
+from services.journal import enregistrer_action, vider_journal
 
 # ===================== INITIALISATION DES SERVICES =====================
+# Les gestionnaires chargent leurs fichiers JSON dès leur création : ils ne sont
+# importés et instanciés qu'à la première entrée dans un sous-menu (voir _services).
 
-gestion_livre = GestionLivre()
-gestion_user = GestionUser()
+gestion_livre = None
+gestion_user = None
+gestion_reservation = None
+gestion_emprunt = None
 
-# Les gestionnaires ont besoin de se connaître mutuellement pour coordonner les opérations
-# On configure d'abord la réservation sans la gestion d'emprunt, puis on ajoute les références circulaires
-gestion_reservation = GestionReservation(gestion_livre=gestion_livre, gestion_emprunt=None, gestion_user=gestion_user)
-gestion_livre._gestion_reservation = gestion_reservation
+# Méthodes des gestionnaires utilisées par les commandes, résolues par _services()
+_OPS: Dict[str, Optional[Callable]] = {}
 
-# Création du gestionnaire d'emprunt avec toutes les dépendances
-gestion_emprunt = GestionEmprunt(gestion_livre, gestion_user, gestion_reservation)
 
-# Complète la chaîne de dépendances pour éviter les références circulaires lors de l'instanciation
-gestion_reservation._gestion_emprunt = gestion_emprunt
+def _services():
+    """
+    Importe et instancie les gestionnaires au premier appel.
+    Les appels suivants n'ont aucun effet.
+    """
+    global gestion_livre, gestion_user, gestion_reservation, gestion_emprunt
+    if gestion_livre is not None:
+        return
+
+    from services.registre import Services
+    from services.gestion_livre import GestionLivre
+    from services.gestion_user import GestionUtilisateur as GestionUser
+    from services.gestion_reservation import GestionReservation
+    from services.gestion_emprunt import GestionEmprunt
+
+    # Les gestionnaires ont besoin de se connaître mutuellement pour coordonner les opérations :
+    # ils partagent un même registre dans lequel chacun est enregistré après sa création
+    services = Services()
+    services.livre = GestionLivre(services)
+    services.user = GestionUser()
+    services.reservation = GestionReservation(services)
+    services.emprunt = GestionEmprunt(services)
+
+    gestion_user, gestion_reservation, gestion_emprunt = services.user, services.reservation, services.emprunt
+    gestion_livre = services.livre
+    _resoudre_operations()
+
+
+def _methode(service, *noms) -> Optional[Callable]:
+    """Retourne la première méthode appelable parmi `noms`, ou None."""
+    for nom in noms:
+        fn = getattr(service, nom, None)
+        if callable(fn):
+            return fn
+    return None
 
 
+def _resoudre_operations() -> None:
+    """
+    Résout une seule fois les méthodes des gestionnaires utilisées par les commandes,
+    pour éviter un getattr + callable à chaque appel de commande.
+    """
+    _OPS.update({
+        'add_book': _methode(gestion_livre, 'ajouter_livre'),
+        'list_books': _methode(gestion_livre, 'lister_livres'),
+        'delete_book': _methode(gestion_livre, 'supprimer_livre', 'delete_livre'),
+        'add_exemplaire': _methode(gestion_livre, 'ajouter_exemplaire'),
+        'search_books': _methode(gestion_livre, 'rechercher'),
+        'get_book': _methode(gestion_livre, 'get_livre'),
+        'remove_exemplaire': _methode(gestion_livre, 'retirer_exemplaire'),
+        'list_exemplaires': _methode(gestion_livre, 'afficher_exemplaires'),
+        'list_users': _methode(gestion_user, 'lister_utilisateurs'),
+        'create_user': _methode(gestion_user, 'creer_utilisateur'),
+        'get_user': _methode(gestion_user, 'get_utilisateur_par_matricule'),
+        'get_user_by_email': _methode(gestion_user, 'get_utilisateur_par_email'),
+        'deactivate_user': _methode(gestion_user, 'desactiver_utilisateur'),
+        'activate_user': _methode(gestion_user, 'activer_utilisateur'),
+    })
 
 
 #======================= UTILITAIRES D'AFFICHAGE =======================
 # Fonctions pour faciliter l'affichage et l'interaction utilisateur
 
+# Nombre de lignes de données écrites d'un bloc par print_table
+TAILLE_BLOC_AFFICHAGE = 1000
+
+# Message affiché par print_table quand il n'y a aucune ligne
+TABLE_VIDE = "Aucune donnée à afficher.\n"
+
 def input_nonempty(prompt):
     """
     Demande une saisie utilisateur et la valide pour qu'elle ne soit pas vide.
@@ -51,9 +111,39 @@ def input_nonempty(prompt):
         str: La saisie utilisateur validée (non vide)
     """
     while True:
-        v = input(prompt).strip()
-        if v:
-            return v
+        v = input(prompt)
+        # La copie nettoyée n'est créée que si la saisie contient autre chose que des espaces
+        if v and not v.isspace():
+            return v.strip()
+
+
+def input_choice(prompt, choix, message_erreur):
+    """
+    Demande un choix parmi les clés de `choix` jusqu'à obtenir une clé valide.
+
+    Args:
+        prompt: Le message à afficher à l'utilisateur
+        choix: Dictionnaire {saisie: valeur} des choix acceptés
+        message_erreur: Le message affiché après une saisie invalide
+
+    Returns:
+        La valeur associée à la saisie
+    """
+    while True:
+        valeur = choix.get(input(prompt).strip())
+        if valeur is not None:
+            return valeur
+        print(message_erreur)
+
+
+def format_date(d):
+    """Formate une date en 'AAAA-MM-JJ' sans passer par strftime (appelé pour chaque ligne des listes)."""
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d}"
+
+
+def format_date_heure(d):
+    """Formate une date en 'AAAA-MM-JJ HH:MM' sans passer par strftime."""
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d} {d.hour:02d}:{d.minute:02d}"
 
 
 def print_table(headers, rows):
@@ -63,74 +153,157 @@ def print_table(headers, rows):
     
     Args:
         headers: Liste des en-têtes de colonnes
-        rows: Liste de listes contenant les données à afficher
+        rows: Itérable de lignes (liste ou générateur) contenant les données à afficher
+    """
+    # Convertit une seule fois toutes les cellules en chaînes (celles qui en sont déjà sont gardées telles quelles).
+    # C'est la seule copie matérialisée des lignes : un générateur peut être passé directement.
+    rows_str = tuple(tuple(cell if type(cell) is str else str(cell) for cell in r) for r in rows)
+
+    # Tableau vide : rien à mettre en forme
+    if not rows_str:
+        sys.stdout.write(TABLE_VIDE)
+        return
+
+    # Le tableau est écrit en un seul appel (par blocs pour les très grands tableaux)
+    for bloc in _rendre_table(tuple(headers), rows_str):
+        sys.stdout.write(bloc)
+
+
+def _rendre_table(headers, rows_str):
     """
-    # Calcule la largeur minimale basée sur les en-têtes
-    widths = [len(h) for h in headers]
+    Construit le texte du tableau affiché par print_table, découpé en blocs
+    de TAILLE_BLOC_AFFICHAGE lignes de données.
     
-    # Met à jour les largeurs en fonction du contenu des lignes
-    for r in rows:
-        for i, cell in enumerate(r):
-            widths[i] = max(widths[i], len(str(cell)))
+    Args:
+        headers: Tuple des en-têtes de colonnes
+        rows_str: Tuple de tuples de cellules déjà converties en chaînes
+        
+    Returns:
+        tuple: Les blocs de texte à écrire
+    """
+    # Largeur de chaque colonne : plus longue valeur entre l'en-tête et le contenu
+    widths = tuple(max(map(len, col)) for col in zip(headers, *rows_str))
+    sep, fmt = _gabarits_table(widths)
 
-    # Crée la ligne de séparation avec les + et -
-    sep = '+' + '+'.join('-' * (w + 2) for w in widths) + '+'
+    lines = [sep, fmt.format(*headers)]
+    blocs = []
 
-    # Format des cellules d'en-tête avec espaces de padding
-    header_cells = [' ' + headers[i].ljust(widths[i]) + ' ' for i in range(len(headers))]
-    print(sep)
-    print('|' + '|'.join(header_cells) + '|')
-    print(sep)
+    # Construit chaque ligne de données avec le même formatage
+    for n, row in enumerate(rows_str, 1):
+        lines.append(fmt.format(*row))
+        if n % TAILLE_BLOC_AFFICHAGE == 0:
+            blocs.append(''.join(lines))
+            lines = []
 
-    # Affiche chaque ligne de données avec le même formatage
-    for row in rows:
-        row_cells = [' ' + str(row[i]).ljust(widths[i]) + ' ' for i in range(len(headers))]
-        print('|' + '|'.join(row_cells) + '|')
-        print(sep)
+    if lines:
+        blocs.append(''.join(lines))
+    return tuple(blocs)
 
 
+@lru_cache(maxsize=64)
+def _gabarits_table(widths):
+    """
+    Construit la ligne de séparation et le gabarit de ligne d'un tableau.
+    Mis en cache par largeurs de colonnes : les tableaux de même forme
+    réutilisent les mêmes chaînes.
+    
+    Args:
+        widths: Tuple des largeurs de colonnes
+        
+    Returns:
+        tuple: (séparateur, gabarit d'une ligne suivie de son séparateur)
+    """
+    # Crée la ligne de séparation avec les + et -
+    sep = '+' + '+'.join('-' * (w + 2) for w in widths) + '+\n'
+
+    # Gabarit d'une ligne suivie de son séparateur : chaque cellule est complétée
+    # par des espaces jusqu'à la largeur de sa colonne
+    fmt = '| ' + ' | '.join('{:<' + str(w) + '}' for w in widths) + ' |\n' + sep
+    return sep, fmt
+
 
-def print_section(title: str, content_lines: List[str] = None):
+def print_section(title: str, content_lines: Optional[List[str]] = None):
     """Affiche une section avec un titre encadré et un contenu indenté."""
     width = 70
     title_line = f" {title} ".center(width, "=")
-    print(f"\n{title_line}")
+    lines = [f"\n{title_line}"]
     if content_lines:
-        for line in content_lines:
-            print(f"  {line}")
+        lines.extend(f"  {line}" for line in content_lines)
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 def print_header(title: str, width: int = 70):
     """Affiche un en-tête bien centré avec des bordures."""
-    print("=" * width)
-    print(title.center(width))
-    print("=" * width)
+    bordure = "=" * width
+    sys.stdout.write(f"{bordure}\n{title.center(width)}\n{bordure}\n")
+
+
+# Cache des noms d'attributs trouvés par to_attr, indexé par (type de l'objet, noms candidats).
+# Pour une classe donnée, le premier nom qui répond est toujours le même : on évite ainsi
+# de refaire tous les getattr infructueux à chaque ligne affichée.
+_ATTR_CACHE = {}
+
+# Noms candidats des colonnes affichées par display_livres
+ATTRS_ISBN = ("isbn", "ISBN")
+ATTRS_TITRE = ("titre", "title")
+ATTRS_AUTEUR = ("auteur", "author")
+ATTRS_EDITEUR = ("editeur", "publisher")
+ATTRS_ANNEE = ("annee_publication", "annee", "year")
+ATTRS_CATEGORIE = ("categorie", "category")
+ATTRS_STATUT = ("statut", "status")
+ATTRS_MOTS_CLES = ("mots_cles", "motscles", "keywords")
+
+# Accesseurs directs utilisés quand display_livres ne reçoit que des objets Livre
+_get_isbn = attrgetter("isbn")
+_get_titre = attrgetter("titre")
+_get_auteur = attrgetter("auteur")
+_get_editeur = attrgetter("editeur")
+_get_annee = attrgetter("annee_publication")
+_get_categorie = attrgetter("categorie")
+_get_statut = attrgetter("statut")
+_get_mots_cles = attrgetter("mots_cles")
 
 
 def to_attr(obj, attr_list):
     """
     Essaie d'accéder à plusieurs attributs d'un objet jusqu'à trouver une valeur non-None.
     Utile pour gérer différentes conventions de nommage (français/anglais).
+    Le nom retenu est mémorisé par type d'objet pour les appels suivants.
     
     Args:
         obj: L'objet ou dictionnaire à consulter
-        attr_list: Liste de noms d'attributs à essayer
+        attr_list: Tuple (ou liste) de noms d'attributs à essayer
         
     Returns:
         La première valeur trouvée non-None, ou chaîne vide si aucune trouvée
     """
+    # Les noms passés sous forme de tuple (constantes ATTRS_*) servent directement de clé
+    cle = (type(obj), attr_list if type(attr_list) is tuple else tuple(attr_list))
+
+    # Accès direct avec le nom mémorisé pour ce type
+    trouve = _ATTR_CACHE.get(cle)
+    if trouve is not None:
+        par_cle, nom = trouve
+        if par_cle:
+            if nom in obj:
+                return obj[nom]
+        else:
+            v = getattr(obj, nom, None)
+            if v is not None:
+                return v
+
     # Essaie d'accéder comme attribut d'objet
     for a in attr_list:
         v = getattr(obj, a, None)
         if v is not None:
+            _ATTR_CACHE[cle] = (False, a)
             return v
     
     # Si l'objet est un dictionnaire, essaie les clés
-    try:
+    if isinstance(obj, Mapping):
         for a in attr_list:
             if a in obj:
+                _ATTR_CACHE[cle] = (True, a)
                 return obj[a]
-    except Exception:
-        pass
     return ''
 
 
@@ -143,24 +316,36 @@ def display_livres(livres):
         livres: Liste d'objets Livre ou dictionnaires contenant les informations des livres
     """
     headers = ["ISBN", "Titre", "Auteur", "Éditeur", "Année", "Catégorie", "Statut", "Mots-clés"]
+
+    # Chemin rapide : uniquement des objets Livre, on extrait chaque colonne d'un bloc
+    if all(type(l) is Livre for l in livres):
+        isbns = list(map(_get_isbn, livres))
+        titres = list(map(_get_titre, livres))
+        auteurs = list(map(_get_auteur, livres))
+        editeurs = list(map(_get_editeur, livres))
+        annees = list(map(str, map(_get_annee, livres)))
+        cats = list(map(str, map(_get_categorie, livres)))
+        statuts = list(map(_get_statut, livres))
+        mots = [','.join(m) for m in map(_get_mots_cles, livres)]
+        print_table(headers, list(zip(isbns, titres, auteurs, editeurs, annees, cats, statuts, mots)))
+        return
+
     rows = []
     
     for l in livres:
         # Utilise to_attr pour gérer les variations de noms d'attributs
-        isbn = to_attr(l, ["isbn", "ISBN"])
-        titre = to_attr(l, ["titre", "title"]) or ''
-        auteur = to_attr(l, ["auteur", "author"]) or ''
-        editeur = to_attr(l, ["editeur", "publisher"]) or ''
-        annee = to_attr(l, ["annee_publication", "annee", "year"]) or ''
-        cat = to_attr(l, ["categorie", "category"]) or ''
-        statut = to_attr(l, ["statut", "status"]) or ''
-        mots = to_attr(l, ["mots_cles", "motscles", "keywords"]) or ''
-        
-        # Convertit les listes de mots-clés en chaîne séparée par des virgules
-        if isinstance(mots, (list, tuple)):
-            mots = ','.join(mots)
+        isbn = to_attr(l, ATTRS_ISBN)
+        titre = to_attr(l, ATTRS_TITRE) or ''
+        auteur = to_attr(l, ATTRS_AUTEUR) or ''
+        editeur = to_attr(l, ATTRS_EDITEUR) or ''
+        annee = to_attr(l, ATTRS_ANNEE) or ''
+        cat = to_attr(l, ATTRS_CATEGORIE) or ''
+        statut = to_attr(l, ATTRS_STATUT) or ''
+        mots = to_attr(l, ATTRS_MOTS_CLES) or ''
         
-        rows.append([isbn, titre, auteur, editeur, str(annee), str(cat), statut, mots])
+        # Les mots-clés déjà sous forme de chaîne sont gardés, les collections sont jointes par des virgules
+        rows.append([isbn, titre, auteur, editeur, str(annee), str(cat), statut,
+                     mots if type(mots) is str else ','.join(map(str, mots))])
     
     print_table(headers, rows)
 
@@ -171,6 +356,29 @@ def display_livres(livres):
 
 # ================= SECTION 1: Commandes sur les Livres et exemplaires =================
 
+# En-têtes du tableau des exemplaires
+HEADERS_EXEMPLAIRES = ('Code barre', 'Statut')
+
+# Mapping entre choix utilisateur et énumération de catégories
+CATEGORIE_MAP = {
+    '1': CategorieLivre.SCIENCE,
+    '2': CategorieLivre.LITTERATURE,
+    '3': CategorieLivre.INFORMATIQUE,
+    '4': CategorieLivre.TECHNOLOGIE,
+    '5': CategorieLivre.IA,
+    '6': CategorieLivre.AUTRE
+}
+
+CATEGORIE_PROMPT = (
+    "\nCatégorie de livre disponible :\n"
+    "1) Science\n"
+    "2) Littérature\n"
+    "3) Informatique\n"
+    "4) Technologie\n"
+    "5) Intelligence Artificielle\n"
+    "6) Autre\n"
+)
+
 def cmd_add_book():
     """
     Ajoute un nouveau livre à la bibliothèque.
@@ -182,32 +390,10 @@ def cmd_add_book():
     editeur = input('Éditeur: ').strip()
 
     # --- Choix de la catégorie du livre avec affichage des options
-    print("\nCatégorie de livre disponible :")
-    print("1) Science")
-    print("2) Littérature")
-    print("3) Informatique")
-    print("4) Technologie")
-    print("5) Intelligence Artificielle")
-    print("6) Autre")
-    
-    # Mapping entre choix utilisateur et énumération de catégories
-    categorie_map = {
-        '1': CategorieLivre.SCIENCE,
-        '2': CategorieLivre.LITTERATURE,
-        '3': CategorieLivre.INFORMATIQUE,
-        '4': CategorieLivre.TECHNOLOGIE,
-        '5': CategorieLivre.IA,
-        '6': CategorieLivre.AUTRE
-    }
-
-    # Boucle de validation jusqu'à un choix valide
-    while True:
-        choix_categorie = input("Choisissez une catégorie (1-6) : ").strip()
-        if choix_categorie in categorie_map:
-            categorie = categorie_map[choix_categorie]
-            break
-        else:
-            print("Veuillez entrer 1, 2, 3, 4, 5 ou 6.")
+    sys.stdout.write(CATEGORIE_PROMPT)
+
+    # Redemande jusqu'à un choix valide
+    categorie = input_choice("Choisissez une catégorie (1-6) : ", CATEGORIE_MAP, "Veuillez entrer 1, 2, 3, 4, 5 ou 6.")
 
     annee = input('Année de publication: ').strip()
     mots = input('Mots-clés (séparés par ,): ').split(',')
@@ -230,8 +416,8 @@ def cmd_add_book():
 
     # Tentative d'ajout du livre
     try:
-        fn = getattr(gestion_livre, 'ajouter_livre', None)
-        if callable(fn):
+        fn = _OPS['add_book']
+        if fn is not None:
             fn(livre)
             print('Livre ajouté.')
         else:
@@ -244,8 +430,8 @@ def cmd_list_books():
     """Liste tous les livres de la bibliothèque dans un tableau formaté."""
     try:
         
-        fn = getattr(gestion_livre, 'lister_livres', None)
-        if callable(fn):
+        fn = _OPS['list_books']
+        if fn is not None:
             data = fn()
             display_livres(data)
         else:
@@ -258,8 +444,8 @@ def cmd_delete_book():
     """Supprime un livre par son ISBN."""
     isbn = input_nonempty('ISBN à supprimer: ')
     try:
-        fn = getattr(gestion_livre, 'supprimer_livre', None) or getattr(gestion_livre, 'delete_livre', None)
-        if callable(fn):
+        fn = _OPS['delete_book']
+        if fn is not None:
             fn(isbn)
             print('Livre supprimé.')
         else:
@@ -281,8 +467,8 @@ def cmd_add_exemplaire():
     isbn = input_nonempty('ISBN du livre: ')
     code = input('Code barre exemplaire : ').strip() or None
     try:
-        fn = getattr(gestion_livre, 'ajouter_exemplaire', None)
-        if callable(fn):
+        fn = _OPS['add_exemplaire']
+        if fn is not None:
             ex = Exemplaire(code_barre=code)
             fn(isbn, ex)
             print('Exemplaire ajouté.')
@@ -304,8 +490,8 @@ def cmd_search_books():
     """Recherche les livres par titre, auteur, ISBN ou mots-clés."""
     mot = input_nonempty('Rechercher par titre, auteur, ISBN ou mot-clé: ')
     try:
-        fn = getattr(gestion_livre, 'rechercher', None)
-        if callable(fn):
+        fn = _OPS['search_books']
+        if fn is not None:
             res = fn(mot)
             display_livres(res)
         else:
@@ -321,8 +507,8 @@ def cmd_show_book():
     
     # Recherche le livre avec gestion d'erreur
     try:
-        fn = getattr(gestion_livre, 'get_livre', None)
-        if callable(fn):
+        fn = _OPS['get_book']
+        if fn is not None:
             livre = fn(isbn)
     except Exception:
         livre = None
@@ -331,15 +517,19 @@ def cmd_show_book():
         print('Livre introuvable.')
         return
 
-    # Affiche les informations principales du livre
-    print(f"Titre: {livre.titre}\nAuteur: {livre.auteur}\nEditeur: {livre.editeur}\nAnnée: {livre.annee_publication}\nNombre exemplaires: {livre.nombre_exemplaires}\nDisponibles: {livre.exemplaires_disponibles}\nStatut: {livre.statut}")
+    # Informations principales du livre
+    lignes = [f"Titre: {livre.titre}\nAuteur: {livre.auteur}\nEditeur: {livre.editeur}\nAnnée: {livre.annee_publication}\nNombre exemplaires: {livre.nombre_exemplaires}\nDisponibles: {livre.exemplaires_disponibles}\nStatut: {livre.statut}"]
     
-    # Affiche les exemplaires si disponibles
+    # Ajoute les exemplaires si disponibles
     exs = getattr(livre, 'exemplaires', [])
     if exs:
-        print('Exemplaires:')
+        lignes.append('Exemplaires:')
         for ex in exs:
-            print(f" - ID: {getattr(ex, 'code_barre', '')} | statut: {getattr(ex, 'statut', '')} | etat: {getattr(ex, 'etat', '')}")
+            lignes.append(f" - ID: {getattr(ex, 'code_barre', '')} | statut: {getattr(ex, 'statut', '')} | etat: {getattr(ex, 'etat', '')}")
+
+    # Une seule écriture pour toute la fiche
+    lignes.append('')
+    sys.stdout.write('\n'.join(lignes))
 
 
 def cmd_modify_book():
@@ -412,8 +602,8 @@ def cmd_remove_exemplaire():
     isbn = input_nonempty('ISBN du livre: ')
     id_ex = input_nonempty('Code barre exemplaire: ')
     try:
-        fn = getattr(gestion_livre, 'retirer_exemplaire', None)
-        if callable(fn):
+        fn = _OPS['remove_exemplaire']
+        if fn is not None:
             ok = fn(isbn, id_ex)
             print('Exemplaire supprimé.' if ok else 'Exemplaire non trouvé ou non supprimable.')
         else:
@@ -433,14 +623,11 @@ def cmd_list_exemplaires():
     """Liste tous les exemplaires d'un livre spécifique."""
     isbn = input_nonempty('ISBN du livre: ')
     try:
-        fn = getattr(gestion_livre, 'afficher_exemplaires', None)
-        if callable(fn):
+        fn = _OPS['list_exemplaires']
+        if fn is not None:
             exs = fn(isbn)
-            headers = ['Code barre', 'Statut']
-            rows = []
-            for ex in exs:
-                rows.append([getattr(ex, 'code_barre', ''), getattr(ex, 'statut', '')])
-            print_table(headers, rows)
+            rows = [(getattr(ex, 'code_barre', ''), getattr(ex, 'statut', '')) for ex in exs]
+            print_table(HEADERS_EXEMPLAIRES, rows)
         else:
             print('Fonction d\'affichage des exemplaires non trouvée')
     except Exception as e:
@@ -448,12 +635,33 @@ def cmd_list_exemplaires():
 
 # ================= SECTION 2: Commandes sur les Utilisateurs =================
 
+# Mapping entre choix utilisateur et énumération de type
+TYPE_MAP = {
+    '1': TypeUtilisateur.ETUDIANT,
+    '2': TypeUtilisateur.PROFESSEUR,
+    '3': TypeUtilisateur.EXTERNE
+}
+
+TYPE_PROMPT_CREATION = (
+    "\nTypes d'utilisateurs disponibles :\n"
+    "1) Étudiant\n"
+    "2) Enseignant\n"
+    "3) Personnel administratif\n"
+)
+
+TYPE_PROMPT_MODIFICATION = (
+    "\nTypes disponibles :\n"
+    "1) Étudiant\n"
+    "2) Professeur\n"
+    "3) Personnel administratif\n"
+)
+
 def cmd_list_users():
     """Affiche la liste de tous les utilisateurs."""
     try:
         # La méthode lister_utilisateurs affiche déjà un tableau formaté
-        fn = getattr(gestion_user, 'lister_utilisateurs', None)
-        if callable(fn):
+        fn = _OPS['list_users']
+        if fn is not None:
             fn()
         else:
             print('Méthode de listage non trouvée dans GestionUser')
@@ -469,30 +677,14 @@ def cmd_create_user():
     telephone = input_nonempty('Téléphone: ')
 
     # --- Affichage des types d'utilisateurs disponibles ---
-    print("\nTypes d'utilisateurs disponibles :")
-    print("1) Étudiant")
-    print("2) Enseignant")
-    print("3) Personnel administratif")
-
-    # Mapping entre choix utilisateur et énumération de type
-    type_map = {
-        '1': TypeUtilisateur.ETUDIANT,
-        '2': TypeUtilisateur.PROFESSEUR,
-        '3': TypeUtilisateur.EXTERNE
-    }
-
-    # Boucle de validation pour le choix du type
-    while True:
-        choix_type = input("Choisissez un type (1-3) : ").strip()
-        if choix_type in type_map:
-            type_utilisateur = type_map[choix_type]
-            break
-        else:
-            print("Veuillez entrer 1, 2 ou 3.")
+    sys.stdout.write(TYPE_PROMPT_CREATION)
+
+    # Redemande jusqu'à un type valide
+    type_utilisateur = input_choice("Choisissez un type (1-3) : ", TYPE_MAP, "Veuillez entrer 1, 2 ou 3.")
 
     try:
-        fn = getattr(gestion_user, 'creer_utilisateur', None)
-        if callable(fn):
+        fn = _OPS['create_user']
+        if fn is not None:
             u = fn(
                 nom=nom,
                 prenom=prenom,
@@ -527,8 +719,8 @@ def cmd_search_user_by_matricule():
     """Recherche et affiche un utilisateur par son matricule."""
     m = input_nonempty('Matricule: ')
     try:
-        fn = getattr(gestion_user, 'get_utilisateur_par_matricule', None)
-        if callable(fn):
+        fn = _OPS['get_user']
+        if fn is not None:
             u = fn(m)
             if u:
                 print(f"Matricule: {u.matricule} | Nom: {u.nom_complet()} | Email: {u.email} | Statut: {u.statut}")
@@ -544,8 +736,8 @@ def cmd_search_user_by_email():
     """Recherche et affiche un utilisateur par son adresse email."""
     email = input_nonempty('Email: ')
     try:
-        fn = getattr(gestion_user, 'get_utilisateur_par_email', None)
-        if callable(fn):
+        fn = _OPS['get_user_by_email']
+        if fn is not None:
             u = fn(email)
             if u:
                 print(f"Matricule: {u.matricule} | Nom: {u.nom_complet()} | Email: {u.email} | Statut: {u.statut}")
@@ -561,8 +753,8 @@ def cmd_deactivate_user():
     """Désactive un utilisateur (révoque ses droits d'accès)."""
     m = input_nonempty('Matricule: ')
     try:
-        fn = getattr(gestion_user, 'desactiver_utilisateur', None)
-        if callable(fn):
+        fn = _OPS['deactivate_user']
+        if fn is not None:
             ok = fn(m)
             print('Utilisateur désactivé.' if ok else 'Utilisateur non trouvé')
         else:
@@ -582,8 +774,8 @@ def cmd_activate_user():
     """Réactive un utilisateur (restaure ses droits d'accès)."""
     m = input_nonempty('Matricule: ')
     try:
-        fn = getattr(gestion_user, 'activer_utilisateur', None)
-        if callable(fn):
+        fn = _OPS['activate_user']
+        if fn is not None:
             ok = fn(m)
             print('Utilisateur activé.' if ok else 'Utilisateur non trouvé')
         else:
@@ -648,25 +840,15 @@ def cmd_edit_user():
             print('Téléphone invalide:', e)
 
     # ---- Modification du type d'utilisateur ----
-    print("\nTypes disponibles :")
-    print("1) Étudiant")
-    print("2) Professeur")
-    print("3) Personnel administratif")
+    sys.stdout.write(TYPE_PROMPT_MODIFICATION)
     print(f"Actuel : {utilisateur.type_utilisateur.label}")
-    
-    from models.enums import TypeUtilisateur
-    type_map = {
-        '1': TypeUtilisateur.ETUDIANT,
-        '2': TypeUtilisateur.PROFESSEUR,
-        '3': TypeUtilisateur.EXTERNE
-    }
 
     type_input = input("Nouveau type (1-3, ou Entrée pour conserver) : ").strip()
-    if type_input in type_map:
-        nouvel_type = type_map[type_input]
+    if type_input in TYPE_MAP:
+        nouvel_type = TYPE_MAP[type_input]
         if nouvel_type != utilisateur.type_utilisateur:
-            # Accès direct à l'attribut privé pour modifier le type
-            utilisateur._User__type_utilisateur = nouvel_type  
+            # Le setter met aussi à jour la limite d'emprunts du nouveau type
+            utilisateur.type_utilisateur = nouvel_type
             print(f"Type mis à jour : {nouvel_type.label}")
     elif type_input:
         print("Type non reconnu. Aucune modification.")
@@ -700,6 +882,27 @@ def cmd_remove_user():
 
 # ================= SECTION 3: Commandes d'emprunts d'ouvrage =================
 
+# En-têtes des tableaux d'emprunts
+HEADERS_EMPRUNTS_EN_COURS = ('ID', 'Matricule', 'Nom et Prénom', 'ISBN', 'Titre', 'Exemplaire', 'Date emprunt', 'Date échéance')
+HEADERS_EMPRUNTS_HISTORIQUE = ('ID', 'Matricule', 'Nom et Prénom', 'ISBN', 'Titre', 'Exemplaire', 'Date emprunt', 'Date échéance', 'Date retour', 'Statut')
+HEADERS_EMPRUNTS_USER = ('ID', 'ISBN', 'Titre', 'Exemplaire', 'Date emprunt', 'Date échéance')
+
+# Traitement des erreurs de cmd_borrow par classe d'exception :
+# (message affiché, afficher l'erreur après le message, détails journalisés, niveau)
+ERREURS_EMPRUNT = {
+    ValueError: ('Erreur :', True,
+                 "Erreur de validation lors de l'emprunt pour l'utilisateur {uid} : {e}", "WARNING"),
+    ExemplaireIndisponible: ('Aucun exemplaire disponible pour ce livre.', False,
+                             "Aucun exemplaire disponible pour ce livre avec le code barre {code}", "WARNING"),
+    LimiteAtteinte: ('Vous avez atteint la limite d\'emprunts autorisée.', False,
+                     "Limite d'emprunts atteinte pour l'utilisateur {uid}", "WARNING"),
+    EmpruntError: ('Impossible d\'emprunter :', True,
+                   "Erreur lors de l'emprunt pour l'utilisateur {uid} : {e}", "ERROR"),
+    Exception: ('Erreur inattendue :', True,
+                "Erreur inattendue lors de l'emprunt pour l'utilisateur {uid} : {e}", "ERROR"),
+}
+
+
 def cmd_borrow():
     """Enregistre un nouvel emprunt pour un utilisateur."""
     uid = input_nonempty('ID User: ')
@@ -713,50 +916,21 @@ def cmd_borrow():
         else:
             gestion_emprunt.emprunter(uid, isbn)
         print('Emprunt enregistré.')
-    except ValueError as e:
-        print('Erreur :', e)
-        enregistrer_action(
-            acteur="Admin",
-            action="EMPRUNT",
-            cible= code or isbn,
-            details= f"Erreur de validation lors de l'emprunt pour l'utilisateur {uid} : {e}",
-            niveau="WARNING"
-        )
-    except ExemplaireIndisponible:
-        print('Aucun exemplaire disponible pour ce livre.')
-        enregistrer_action(
-            acteur="Admin",
-            action="EMPRUNT",
-            cible= code,
-            details= f"Aucun exemplaire disponible pour ce livre avec le code barre {code}",
-            niveau="WARNING"
-        )
-    except LimiteAtteinte:
-        print('Vous avez atteint la limite d\'emprunts autorisée.')
-        enregistrer_action(
-            acteur="Admin",
-            action="EMPRUNT",
-            cible= code,
-            details= f"Limite d'emprunts atteinte pour l'utilisateur {uid}",
-            niveau="WARNING"
-        )
-    except EmpruntError as e:
-        print('Impossible d\'emprunter :', e)
-        enregistrer_action(
-            acteur="Admin",
-            action="EMPRUNT",
-            cible= code,
-            details= f"Erreur lors de l'emprunt pour l'utilisateur {uid} : {e}",
-            niveau="ERROR"
-        )
     except Exception as e:
-        print('Erreur inattendue :', e)
+        # Le traitement dépend de la classe d'erreur la plus précise connue de ERREURS_EMPRUNT
+        message, avec_erreur, details, niveau = next(
+            ERREURS_EMPRUNT[cls] for cls in type(e).__mro__ if cls in ERREURS_EMPRUNT
+        )
+        if avec_erreur:
+            print(message, e)
+        else:
+            print(message)
         enregistrer_action(
             acteur="Admin",
             action="EMPRUNT",
-            cible= code,
-            details= f"Erreur inattendue lors de l'emprunt pour l'utilisateur {uid} : {e}",
-            niveau="ERROR"
+            cible= code or isbn,
+            details= details.format(uid=uid, code=code, e=e),
+            niveau=niveau
         )
 
 
@@ -764,7 +938,10 @@ def cmd_return():
     """Enregistre le retour d'un ouvrage emprunté."""
     eid = input_nonempty('ID emprunt: ')
     try:
-        gestion_emprunt.retourner(eid)
+        # Le retour déclenche aussi le traitement de la file de réservations :
+        # emprunts et journal des réservations écrits une seule fois, en fin de commande
+        with gestion_emprunt.lot(), gestion_reservation.lot():
+            gestion_emprunt.retourner(eid)
         print('Retour enregistré.')
     except EmpruntNonTrouve:
         print('Emprunt introuvable.')
@@ -790,29 +967,31 @@ def cmd_list_emprunts():
     """Affiche la liste de tous les emprunts actuellement en cours."""
     try:
         es = gestion_emprunt.lister_en_cours()
-        headers = ['ID', 'Matricule', 'Nom et Prénom', 'ISBN', 'Titre', 'Exemplaire', 'Date emprunt', 'Date échéance']
-        rows = []
+        rows = [None] * len(es)
+        # Index construits une seule fois pour éviter une recherche linéaire par ligne
+        users_par_mat = gestion_user.utilisateurs_par_matricule()
+        livres_par_isbn = gestion_livre.livres_par_isbn()
         
-        for e in es:
+        for i, e in enumerate(es):
             # Récupère les informations de l'utilisateur
-            user = gestion_user.get_utilisateur_par_matricule(e.matricule_user)
+            user = users_par_mat.get(e.matricule_user)
             nom_prenom = f"{user.nom} {user.prenom}" if user else "Inconnu"
 
             # Récupère les informations du livre
-            livre = gestion_livre.get_livre(e.isbn)
+            livre = livres_par_isbn.get(e.isbn)
             titre = livre.titre if livre else "Titre inconnu"
 
-            rows.append([
+            rows[i] = (
                 e.id_emprunt,
                 e.matricule_user,
                 nom_prenom,
                 e.isbn,
                 titre,
                 e.code_barre,
-                e.date_emprunt.strftime('%Y-%m-%d'),
-                e.date_echeance.strftime('%Y-%m-%d')
-            ])
-        print_table(headers, rows)
+                format_date(e.date_emprunt),
+                format_date(e.date_echeance)
+            )
+        print_table(HEADERS_EMPRUNTS_EN_COURS, rows)
         
         # Journalisation réussie
         enregistrer_action(
@@ -836,29 +1015,32 @@ def cmd_list_all_emprunts():
     """Affiche la liste historique de tous les emprunts (passés et présents)."""
     try:
         es = gestion_emprunt.lister_tous()
-        headers = ['ID', 'Matricule', 'Nom et Prénom', 'ISBN', 'Titre', 'Exemplaire', 'Date emprunt', 'Date échéance', 'Date retour', 'Statut']
-        rows = []
+        rows = [None] * len(es)
+        users_par_mat = gestion_user.utilisateurs_par_matricule()
+        livres_par_isbn = gestion_livre.livres_par_isbn()
+        # Une seule lecture de l'horloge pour le statut de tout l'historique
+        maintenant = datetime.now()
         
-        for e in es:
-            user = gestion_user.get_utilisateur_par_matricule(e.matricule_user)
+        for i, e in enumerate(es):
+            user = users_par_mat.get(e.matricule_user)
             nom_prenom = f"{user.nom} {user.prenom}" if user else "Utilisateur supprimé"
-            livre = gestion_livre.get_livre(e.isbn)
+            livre = livres_par_isbn.get(e.isbn)
             titre = livre.titre if livre else "Livre supprimé"
             # Affiche la date de retour seulement si elle existe
-            date_retour = e.date_retour.strftime('%Y-%m-%d') if e.date_retour else ''
-            rows.append([
+            date_retour = format_date(e.date_retour) if e.date_retour else ''
+            rows[i] = (
                 e.id_emprunt,
                 e.matricule_user,
                 nom_prenom,
                 e.isbn,
                 titre,
                 e.code_barre,
-                e.date_emprunt.strftime('%Y-%m-%d'),
-                e.date_echeance.strftime('%Y-%m-%d'),
+                format_date(e.date_emprunt),
+                format_date(e.date_echeance),
                 date_retour,
-                e.statut
-            ])
-        print_table(headers, rows)
+                e.statut_au(maintenant)
+            )
+        print_table(HEADERS_EMPRUNTS_HISTORIQUE, rows)
         enregistrer_action("Admin", "LISTE_TOUS_EMPRUNTS", "N/A", f"{len(es)} emprunt(s) historisés")
     except Exception as e:
         print('Erreur :', e)
@@ -881,16 +1063,20 @@ def cmd_show_emprunt_by_id():
         livre = gestion_livre.get_livre(e.isbn)
         titre = livre.titre if livre else "Livre supprimé"
         
-        # Affiche tous les détails de l'emprunt
-        print(f"ID emprunt     : {e.id_emprunt}")
-        print(f"Utilisateur    : {nom_prenom} ({e.matricule_user})")
-        print(f"Livre          : {titre} ({e.isbn})")
-        print(f"Exemplaire     : {e.code_barre}")
-        print(f"Date emprunt   : {e.date_emprunt.strftime('%Y-%m-%d %H:%M')}")
-        print(f"Date échéance  : {e.date_echeance.strftime('%Y-%m-%d %H:%M')}")
+        # Affiche tous les détails de l'emprunt en une seule écriture
+        lignes = [
+            f"ID emprunt     : {e.id_emprunt}",
+            f"Utilisateur    : {nom_prenom} ({e.matricule_user})",
+            f"Livre          : {titre} ({e.isbn})",
+            f"Exemplaire     : {e.code_barre}",
+            f"Date emprunt   : {format_date_heure(e.date_emprunt)}",
+            f"Date échéance  : {format_date_heure(e.date_echeance)}",
+        ]
         if e.date_retour:
-            print(f"Date retour    : {e.date_retour.strftime('%Y-%m-%d %H:%M')}")
-        print(f"Statut         : {e.statut}")
+            lignes.append(f"Date retour    : {format_date_heure(e.date_retour)}")
+        lignes.append(f"Statut         : {e.statut}")
+        lignes.append('')
+        sys.stdout.write('\n'.join(lignes))
         
         enregistrer_action("Admin", "AFFICHER_EMPRUNT", eid, "Détail affiché")
     except Exception as ex:
@@ -905,9 +1091,8 @@ def cmd_list_suspensions():
         if not s:
             print('Aucune suspension')
             return
-        # Affiche chaque suspension avec la date ISO
-        for matricule, iso in s.items():
-            print(f"{matricule} -> {iso}")
+        # Affiche chaque suspension avec la date ISO, en une seule écriture
+        sys.stdout.write('\n'.join(f"{matricule} -> {iso}" for matricule, iso in s.items()) + '\n')
     except Exception as e:
         print('Erreur :', e)
 
@@ -922,20 +1107,20 @@ def cmd_list_emprunts_user():
             enregistrer_action("Admin", "LISTE_EMPRUNTS_USER", m, "Aucun emprunt")
             return
         
-        headers = ['ID', 'ISBN', 'Titre', 'Exemplaire', 'Date emprunt', 'Date échéance']
-        rows = []
-        for e in es:
-            livre = gestion_livre.get_livre(e.isbn)
+        rows = [None] * len(es)
+        livres_par_isbn = gestion_livre.livres_par_isbn()
+        for i, e in enumerate(es):
+            livre = livres_par_isbn.get(e.isbn)
             titre = livre.titre if livre else "Livre supprimé"
-            rows.append([
+            rows[i] = (
                 e.id_emprunt,
                 e.isbn,
                 titre,
                 e.code_barre,
-                e.date_emprunt.strftime('%Y-%m-%d'),
-                e.date_echeance.strftime('%Y-%m-%d')
-            ])
-        print_table(headers, rows)
+                format_date(e.date_emprunt),
+                format_date(e.date_echeance)
+            )
+        print_table(HEADERS_EMPRUNTS_USER, rows)
         enregistrer_action("Admin", "LISTE_EMPRUNTS_USER", m, f"{len(es)} emprunt(s) affiché(s)")
     except Exception as e:
         print('Erreur :', e)
@@ -946,25 +1131,26 @@ def cmd_list_emprunts_retard():
     """Affiche la liste de tous les emprunts en retard (dépassement de date d'échéance)."""
     try:
         es = gestion_emprunt.lister_en_retard()
-        headers = ['ID', 'Matricule', 'Nom et Prénom', 'ISBN', 'Titre', 'Exemplaire', 'Date emprunt', 'Date échéance']
-        rows = []
+        rows = [None] * len(es)
+        users_par_mat = gestion_user.utilisateurs_par_matricule()
+        livres_par_isbn = gestion_livre.livres_par_isbn()
         
-        for e in es:
-            user = gestion_user.get_utilisateur_par_matricule(e.matricule_user)
+        for i, e in enumerate(es):
+            user = users_par_mat.get(e.matricule_user)
             nom_prenom = f"{user.nom} {user.prenom}" if user else "Utilisateur supprimé"
-            livre = gestion_livre.get_livre(e.isbn)
+            livre = livres_par_isbn.get(e.isbn)
             titre = livre.titre if livre else "Livre supprimé"
-            rows.append([
+            rows[i] = (
                 e.id_emprunt,
                 e.matricule_user,
                 nom_prenom,
                 e.isbn,
                 titre,
                 e.code_barre,
-                e.date_emprunt.strftime('%Y-%m-%d'),
-                e.date_echeance.strftime('%Y-%m-%d')
-            ])
-        print_table(headers, rows)
+                format_date(e.date_emprunt),
+                format_date(e.date_echeance)
+            )
+        print_table(HEADERS_EMPRUNTS_EN_COURS, rows)
         enregistrer_action("Admin", "LISTE_EMPRUNTS_RETARD", "N/A", f"{len(es)} en retard")
     except Exception as e:
         print('Erreur :', e)
@@ -1056,22 +1242,28 @@ def cmd_list_reservations():
             return
         
         headers = ['ID', 'Matricule', 'Nom et Prénom', 'ISBN', 'Titre', 'Date', 'Statut']
-        rows = []
-        for r in rs:
-            user = gestion_user.get_utilisateur_par_matricule(r.matricule_user)
-            nom_prenom = f"{user.nom} {user.prenom}" if user else "Utilisateur supprimé"
-            livre = gestion_livre.get_livre(r.isbn)
-            titre = livre.titre if livre else "Livre supprimé"
-            rows.append([
-                r.id,
-                r.matricule_user,
-                nom_prenom,
-                r.isbn,
-                titre,
-                r.date_reservation.strftime('%Y-%m-%d %H:%M'),
-                r.statut
-            ])
-        print_table(headers, rows)
+        # Index construits une seule fois pour joindre les réservations sans recherche par ligne
+        users_par_mat = gestion_user.utilisateurs_par_matricule()
+        livres_par_isbn = gestion_livre.livres_par_isbn()
+
+        # Les lignes sont produites à la demande par print_table, sans liste intermédiaire
+        def lignes():
+            for r in rs:
+                user = users_par_mat.get(r.matricule_user)
+                nom_prenom = f"{user.nom} {user.prenom}" if user else "Utilisateur supprimé"
+                livre = livres_par_isbn.get(r.isbn)
+                titre = livre.titre if livre else "Livre supprimé"
+                yield (
+                    r.id,
+                    r.matricule_user,
+                    nom_prenom,
+                    r.isbn,
+                    titre,
+                    format_date_heure(r.date_reservation),
+                    r.statut
+                )
+
+        print_table(headers, lignes())
         enregistrer_action("Admin", "LISTE_RESERVATIONS", "N/A", f"{len(rs)} réservation(s) affichée(s)")
     except Exception as e:
         print('Erreur :', e)
@@ -1088,18 +1280,21 @@ def cmd_list_reservations_user():
             enregistrer_action("Admin", "LISTE_RESERVATIONS_USER", m, "Aucune réservation")
             return
         headers = ['ID', 'ISBN', 'Titre', 'Date', 'Statut']
-        rows = []
-        for r in rs:
-            livre = gestion_livre.get_livre(r.isbn)
-            titre = livre.titre if livre else "Livre supprimé"
-            rows.append([
-                r.id,
-                r.isbn,
-                titre,
-                r.date_reservation.strftime('%Y-%m-%d %H:%M'),
-                r.statut
-            ])
-        print_table(headers, rows)
+        livres_par_isbn = gestion_livre.livres_par_isbn()
+
+        def lignes():
+            for r in rs:
+                livre = livres_par_isbn.get(r.isbn)
+                titre = livre.titre if livre else "Livre supprimé"
+                yield (
+                    r.id,
+                    r.isbn,
+                    titre,
+                    format_date_heure(r.date_reservation),
+                    r.statut
+                )
+
+        print_table(headers, lignes())
         enregistrer_action("Admin", "LISTE_RESERVATIONS_USER", m, f"{len(rs)} réservation(s) affichée(s)")
     except Exception as e:
         print('Erreur :', e)
@@ -1120,15 +1315,18 @@ def cmd_show_reservation_by_id():
         livre = gestion_livre.get_livre(r.isbn)
         titre = livre.titre if livre else "Livre supprimé"
         
-        # Affiche les détails avec une belle mise en forme
-        print("------------------------------------")
-        print("Détails de la réservation :")
-        print("------------------------------------")
-        print(f"ID réservation : {r.id}")
-        print(f"Utilisateur    : {nom_prenom} ({r.matricule_user})")
-        print(f"Livre          : {titre} ({r.isbn})")
-        print(f"Date           : {r.date_reservation.strftime('%Y-%m-%d %H:%M')}")
-        print(f"Statut         : {r.statut}")
+        # Affiche les détails avec une belle mise en forme, en une seule écriture
+        sys.stdout.write("\n".join((
+            "------------------------------------",
+            "Détails de la réservation :",
+            "------------------------------------",
+            f"ID réservation : {r.id}",
+            f"Utilisateur    : {nom_prenom} ({r.matricule_user})",
+            f"Livre          : {titre} ({r.isbn})",
+            f"Date           : {format_date_heure(r.date_reservation)}",
+            f"Statut         : {r.statut}",
+            "",
+        )))
         
         enregistrer_action("Admin", "AFFICHER_RESERVATION", rid, "Détail affiché")
     except Exception as ex:
@@ -1166,7 +1364,10 @@ def cmd_confirm_reservation():
     """Confirme une réservation après notification."""
     rid = input_nonempty('ID réservation à confirmer: ')
     try:
-        if gestion_reservation.confirmer(rid):
+        # La confirmation crée un emprunt : écritures regroupées à la fin de la commande
+        with gestion_emprunt.lot(), gestion_reservation.lot():
+            confirmee = gestion_reservation.confirmer(rid)
+        if confirmee:
             print('Réservation confirmée.')
         else:
             print('Confirmation impossible (réservation non notifiée ou introuvable).')
@@ -1174,15 +1375,26 @@ def cmd_confirm_reservation():
         print('Erreur :', e)
 
 
+# Seule la fin du fichier de notifications est affichée (il grossit sans limite)
+TAILLE_MAX_NOTIFICATIONS = 64 * 1024
+
+
 def cmd_show_notifications():
-    """Affiche les notifications de réservation en attente."""
+    """Affiche les notifications de réservation les plus récentes."""
+    # Les notifications sont écrites par lots : vider le tampon avant de relire le fichier
+    gestion_reservation.vider_notifications()
     notif_file = os.path.join("data", "notifications.txt")
     if not os.path.exists(notif_file):
         print("Aucune notification.")
         return
     try:
-        with open(notif_file, 'r', encoding='utf-8') as f:
-            contenu = f.read()
+        taille = os.path.getsize(notif_file)
+        with open(notif_file, 'rb') as f:
+            if taille > TAILLE_MAX_NOTIFICATIONS:
+                f.seek(-TAILLE_MAX_NOTIFICATIONS, os.SEEK_END)
+                # Ignorer la première ligne, probablement tronquée
+                f.readline()
+            contenu = f.read().decode('utf-8', 'replace')
         if contenu.strip():
             print("\n=== Notifications ===")
             print(contenu)
@@ -1194,6 +1406,29 @@ def cmd_show_notifications():
 
 # ================= SECTION 5: Rapports et Statistiques =================
 
+# Dernier rapport généré, associé aux versions des données utilisées pour le produire
+_RAPPORT_CACHE = {"version": None, "texte": None}
+
+
+def _rapport_texte():
+    """
+    Retourne le texte du rapport statistique, en le regénérant seulement si
+    les livres, les emprunts ou les utilisateurs ont changé depuis le dernier appel.
+    """
+    version = (gestion_livre.version, gestion_emprunt.version, gestion_user.version)
+    if _RAPPORT_CACHE["version"] != version:
+        # Import différé : le module n'est chargé que si un rapport est demandé
+        from services.statistiques import Statistiques
+        stats = Statistiques(
+            gestion_livre=gestion_livre,
+            gestion_emprunt=gestion_emprunt,
+            gestion_user=gestion_user
+        )
+        _RAPPORT_CACHE["texte"] = stats.generer_rapport_texte()
+        _RAPPORT_CACHE["version"] = version
+    return _RAPPORT_CACHE["texte"]
+
+
 def cmd_show_dashboard():
     """
     Affiche le tableau de bord statistique complet avec:
@@ -1202,14 +1437,8 @@ def cmd_show_dashboard():
     - Informations sur les categories les plus empruntées
     """
     try:
-        # Crée l'objet statistiques avec les gestionnaires
-        stats = Statistiques(
-            gestion_livre=gestion_livre,
-            gestion_emprunt=gestion_emprunt,
-            gestion_user=gestion_user
-        )
-        rapport = stats.generer_rapport_texte()
-        print(rapport)
+        # Rapport réutilisé tant que les données n'ont pas changé
+        print(_rapport_texte())
     except Exception as e:
         print('Erreur lors de la génération du rapport :', e)
 
@@ -1219,8 +1448,9 @@ def cmd_export_rapport():
     stocké dans le dossier data/stats/
     """
     try:
+        from services.statistiques import Statistiques
         stats = Statistiques(gestion_livre, gestion_emprunt, gestion_user)
-        chemin = stats.exporter()  
+        chemin = stats.exporter(contenu=_rapport_texte())
         print(f" Rapport enregistré avec succès : {chemin}")
     except Exception as e:
         print(f" Erreur lors de l'export du rapport : {e}")
@@ -1231,160 +1461,145 @@ def cmd_export_rapport():
 #=================================================================================================
 # Cette section définit les structures de menus et gère l'interaction avec l'utilisateur
 
-# ================== MENU PRINCIPAL ==================
-MENU_MAIN = {
-    '1': ('Gestion des livres', None),
-    '2': ('Gestion des utilisateurs', None),
-    '3': ('Gestion des emprunts', None),
-    '4': ('Gestion des réservations', None),
-    '5': ('Rapport et Statistiques', None),
-    'q': ('Quitter', None),
-}
+def _texte_menu(titre, options):
+    """Construit une fois pour toutes le texte affiché d'un menu (titre puis une ligne par option)."""
+    return titre + '\n' + ''.join(f"{k}) {v[0]}\n" for k, v in options.items())
+
 
 # ==================== SOUS-MENUS ====================
 
-def livres_menu():
-    """Menu de gestion des livres - permet de lister, ajouter, modifier, supprimer des livres et leurs exemplaires."""
-    OPTS = {
-        '1': ('Ajouter un livre', cmd_add_book),
-        '2': ('Lister les livres', cmd_list_books),
-        '3': ('Rechercher un livre', cmd_search_books),
-        '4': ('Afficher un livre (détails)', cmd_show_book),
-        '5': ('Modifier un livre', cmd_modify_book),
-        '6': ('Supprimer un livre', cmd_delete_book),
-        '7': ('Lister exemplaires d\'un livre', cmd_list_exemplaires),
-        '8': ('Ajouter exemplaire', cmd_add_exemplaire),
-        '9': ('Supprimer exemplaire', cmd_remove_exemplaire),
-        '0': ('Retour', None),
-    }
+MENU_LIVRES = {
+    '1': ('Ajouter un livre', cmd_add_book),
+    '2': ('Lister les livres', cmd_list_books),
+    '3': ('Rechercher un livre', cmd_search_books),
+    '4': ('Afficher un livre (détails)', cmd_show_book),
+    '5': ('Modifier un livre', cmd_modify_book),
+    '6': ('Supprimer un livre', cmd_delete_book),
+    '7': ('Lister exemplaires d\'un livre', cmd_list_exemplaires),
+    '8': ('Ajouter exemplaire', cmd_add_exemplaire),
+    '9': ('Supprimer exemplaire', cmd_remove_exemplaire),
+    '0': ('Retour', None),
+}
+TEXTE_MENU_LIVRES = _texte_menu('\n=== Gestion des livres ===', MENU_LIVRES)
+
+MENU_USERS = {
+    '1': ('Lister les utilisateurs', cmd_list_users),
+    '2': ('Créer un utilisateur', cmd_create_user),
+    '3': ('Modifier un utilisateur', cmd_edit_user),
+    '4': ('Supprimer un utilisateur', cmd_remove_user),
+    '5': ('Rechercher par matricule', cmd_search_user_by_matricule),
+    '6': ('Rechercher par email', cmd_search_user_by_email),
+    '7': ('Activer un utilisateur', cmd_activate_user),
+    '8': ('Désactiver un utilisateur', cmd_deactivate_user),
+    '0': ('Retour', None),
+}
+TEXTE_MENU_USERS = _texte_menu('\n=== Gestion des utilisateurs ===', MENU_USERS)
+
+MENU_EMPRUNTS = {
+    '1': ('Lister emprunts en cours', cmd_list_emprunts),
+    '2': ('Lister emprunts d\'un utilisateur', cmd_list_emprunts_user),
+    '3': ('Lister tous les emprunts', cmd_list_all_emprunts),
+    '4': ('Lister emprunts en retard', cmd_list_emprunts_retard),
+    '5': ('Afficher emprunt par ID', cmd_show_emprunt_by_id),
+    '6': ('Lister suspensions', cmd_list_suspensions),
+    '7': ('Emprunter', cmd_borrow),
+    '8': ('Retourner', cmd_return),
+    '9': ('Renouveler emprunt', cmd_renew),
+    '10': ('Appliquer pénalités', cmd_apply_penalties),
+    '0': ('Retour', None),
+}
+TEXTE_MENU_EMPRUNTS = _texte_menu('\n=== Gestion des emprunts ===', MENU_EMPRUNTS)
+
+MENU_RESERVATIONS = {
+    '1': ('Créer une réservation', cmd_create_reservation),
+    '2': ('Lister toutes les réservations', cmd_list_reservations),
+    '3': ('Lister réservations par utilisateur', cmd_list_reservations_user),
+    '4': ('Afficher réservation par ID', cmd_show_reservation_by_id),
+    '5': ('Annuler une réservation', cmd_cancel_reservation),
+    '6': ('Traiter la file d\'un ISBN (notifier tête)', cmd_process_queue),
+    '7': ('Confirmer une réservation', cmd_confirm_reservation),
+    '8': ('Afficher les notifications', cmd_show_notifications),
+    '0': ('Retour', None),
+}
+TEXTE_MENU_RESERVATIONS = _texte_menu('\n=== Gestion des réservations ===', MENU_RESERVATIONS)
+
+MENU_STATS = {
+    '1': ('Afficher le tableau de bord complet', cmd_show_dashboard),
+    '2': ("Imprimer le rapport dans un fichier texte", cmd_export_rapport),
+    '0': ('Retour', None),
+}
+TEXTE_MENU_STATS = _texte_menu('\n=== Statistiques ===', MENU_STATS)
+
+
+def run_menu(options, texte, message_erreur='Erreur:', quitter='0', message_sortie=None):
+    """
+    Boucle commune à tous les menus : affiche le menu, lit le choix et
+    exécute la commande associée jusqu'au choix `quitter`.
+    
+    Args:
+        options: Dictionnaire {choix: (libellé, commande)} du menu
+        texte: Texte pré-rendu du menu (voir _texte_menu)
+        message_erreur: Préfixe affiché si la commande lève une exception
+        quitter: Choix qui termine la boucle ('0' pour les sous-menus)
+        message_sortie: Message optionnel affiché en quittant
+    """
     while True:
-        print('\n=== Gestion des livres ===')
-        for k, v in OPTS.items():
-            print(f"{k}) {v[0]}")
+        sys.stdout.write(texte)
         c = input('Choix: ').strip()
-        if c == '0':
+        if c == quitter:
+            # Sortie du menu : on écrit le journal accumulé pendant la boucle
+            vider_journal()
+            if message_sortie:
+                print(message_sortie)
             break
-        action = OPTS.get(c)
+        action = options.get(c)
         if not action:
             print('Choix invalide')
             continue
         try:
             action[1]()
         except Exception as e:
-            print('Erreur:', e)
+            print(message_erreur, e)
+
+
+def livres_menu():
+    """Menu de gestion des livres - permet de lister, ajouter, modifier, supprimer des livres et leurs exemplaires."""
+    _services()
+    run_menu(MENU_LIVRES, TEXTE_MENU_LIVRES)
 
 def users_menu():
     """Menu de gestion des utilisateurs - permet de créer, modifier, consulter et supprimer des utilisateurs."""
-    OPTS = {
-        '1': ('Lister les utilisateurs', cmd_list_users),
-        '2': ('Créer un utilisateur', cmd_create_user),
-        '3': ('Modifier un utilisateur', cmd_edit_user),
-        '4': ('Supprimer un utilisateur', cmd_remove_user),
-        '5': ('Rechercher par matricule', cmd_search_user_by_matricule),
-        '6': ('Rechercher par email', cmd_search_user_by_email),
-        '7': ('Activer un utilisateur', cmd_activate_user),
-        '8': ('Désactiver un utilisateur', cmd_deactivate_user),
-        '0': ('Retour', None),
-    }
-    while True:
-        print('\n=== Gestion des utilisateurs ===')
-        for k, v in OPTS.items():
-            print(f"{k}) {v[0]}")
-        c = input('Choix: ').strip()
-        if c == '0':
-            break
-        action = OPTS.get(c)
-        if not action:
-            print('Choix invalide')
-            continue
-        try:
-            action[1]()
-        except Exception as e:
-            print('Erreur:', e)
+    _services()
+    run_menu(MENU_USERS, TEXTE_MENU_USERS)
 
 def emprunts_menu():
     """Menu de gestion des emprunts - permet de consulter, créer et gérer les emprunts de livres."""
-    OPTS = {
-        '1': ('Lister emprunts en cours', cmd_list_emprunts),
-        '2': ('Lister emprunts d\'un utilisateur', cmd_list_emprunts_user),
-        '3': ('Lister tous les emprunts', cmd_list_all_emprunts),
-        '4': ('Lister emprunts en retard', cmd_list_emprunts_retard),
-        '5': ('Afficher emprunt par ID', cmd_show_emprunt_by_id),
-        '6': ('Lister suspensions', cmd_list_suspensions),
-        '7': ('Emprunter', cmd_borrow),
-        '8': ('Retourner', cmd_return),
-        '9': ('Renouveler emprunt', cmd_renew),
-        '10': ('Appliquer pénalités', cmd_apply_penalties),
-        '0': ('Retour', None),
-    }
-    while True:
-        print('\n=== Gestion des emprunts ===')
-        for k, v in OPTS.items():
-            print(f"{k}) {v[0]}")
-        c = input('Choix: ').strip()
-        if c == '0':
-            break
-        action = OPTS.get(c)
-        if not action:
-            print('Choix invalide')
-            continue
-        try:
-            action[1]()
-        except Exception as e:
-            print('Erreur:', e)
+    _services()
+    run_menu(MENU_EMPRUNTS, TEXTE_MENU_EMPRUNTS)
 
 def reservations_menu():
     """Menu de gestion des réservations - permet de créer, consulter et gérer les réservations de livres."""
-    OPTS = {
-        '1': ('Créer une réservation', cmd_create_reservation),
-        '2': ('Lister toutes les réservations', cmd_list_reservations),
-        '3': ('Lister réservations par utilisateur', cmd_list_reservations_user),
-        '4': ('Afficher réservation par ID', cmd_show_reservation_by_id),
-        '5': ('Annuler une réservation', cmd_cancel_reservation),
-        '6': ('Traiter la file d\'un ISBN (notifier tête)', cmd_process_queue),
-        '7': ('Confirmer une réservation', cmd_confirm_reservation),
-        '8': ('Afficher les notifications', cmd_show_notifications),
-        '0': ('Retour', None),
-    }
-    while True:
-        print('\n=== Gestion des réservations ===')
-        for k, v in OPTS.items():
-            print(f"{k}) {v[0]}")
-        c = input('Choix: ').strip()
-        if c == '0':
-            break
-        action = OPTS.get(c)
-        if not action:
-            print('Choix invalide')
-            continue
-        try:
-            action[1]()
-        except Exception as e:
-            print('Erreur:', e)
-
+    _services()
+    run_menu(MENU_RESERVATIONS, TEXTE_MENU_RESERVATIONS)
 
 def stats_menu():
     """Menu des statistiques et rapports - permet de consulter et exporter les analyses de la bibliothèque."""
-    OPTS = {
-        '1': ('Afficher le tableau de bord complet', cmd_show_dashboard),
-        '2': ("Imprimer le rapport dans un fichier texte", cmd_export_rapport),
-        '0': ('Retour', None),
-    }
-    while True:
-        print('\n=== Statistiques ===')
-        for k, v in OPTS.items():
-            print(f"{k}) {v[0]}")
-        c = input('Choix: ').strip()
-        if c == '0':
-            break
-        action = OPTS.get(c)
-        if action:
-            try:
-                action[1]()
-            except Exception as e:
-                print('Erreur :', e)
-        else:
-            print('Choix invalide')
+    _services()
+    run_menu(MENU_STATS, TEXTE_MENU_STATS, 'Erreur :')
+
+
+# ================== MENU PRINCIPAL ==================
+
+MENU_MAIN = {
+    '1': ('Gestion des livres', livres_menu),
+    '2': ('Gestion des utilisateurs', users_menu),
+    '3': ('Gestion des emprunts', emprunts_menu),
+    '4': ('Gestion des réservations', reservations_menu),
+    '5': ('Rapport et Statistiques', stats_menu),
+    'q': ('Quitter', None),
+}
+TEXTE_MENU_MAIN = _texte_menu('\n--- Menu principal ---', MENU_MAIN)
+
 
 # =========================== POINT D'ENTRÉE PRINCIPAL ================================
 
@@ -1394,28 +1609,8 @@ def main():
     entre les différents sous-menus de l'application.
     """
     print('=== CLI Biblio-manager ===')
-    while True:
-        print('\n--- Menu principal ---')
-        for k, v in MENU_MAIN.items():
-            print(f"{k}) {v[0]}")
-        choice = input('Choix: ').strip()
-        
-        # Gestion des choix du menu principal
-        if choice == 'q':
-            print("Merci d'avoir utilisé Biblio-manager. Au revoir !")
-            break
-        if choice == '1':
-            livres_menu()
-        elif choice == '2':
-            users_menu()
-        elif choice == '3':
-            emprunts_menu()
-        elif choice == '4':
-            reservations_menu()
-        elif choice == '5':
-            stats_menu()
-        else:
-            print('Choix invalide')
+    run_menu(MENU_MAIN, TEXTE_MENU_MAIN, quitter='q',
+             message_sortie="Merci d'avoir utilisé Biblio-manager. Au revoir !")
 
 
 if __name__ == '__main__':
@@ -9,6 +9,7 @@ dans la bibliothèque. Elle gère :
 - La sérialisation/désérialisation en JSON
 """
 
+import sys
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from utils.generateur import generer_id_unique
@@ -30,6 +31,19 @@ class Emprunt:
     DUREE_PAR_DEFAUT = 14
     MAX_RENOUVELLEMENTS = 2
 
+    # Attributs fixes : pas de __dict__ par instance (l'historique peut contenir des milliers d'emprunts)
+    __slots__ = (
+        "_id_emprunt",
+        "_matricule_user",
+        "_isbn",
+        "_code_barre",
+        "_date_emprunt",
+        "_date_echeance",
+        "_date_retour",
+        "_renouvellements",
+        "_donnees_figees",
+    )
+
     def __init__(
         self,
         matricule_user: str,
@@ -57,7 +71,7 @@ class Emprunt:
             - Les dates sont converties en datetime si nécessaire
         """
         # Génération de l'identifiant unique
-        self.__id_emprunt = generer_id_unique("EMP")
+        self._id_emprunt = generer_id_unique("EMP")
 
         # Références utilisateur et livre (
         
@@ -71,25 +85,28 @@ class Emprunt:
 
         # Initialisation des dates
         
-        self.__date_emprunt = date_emprunt or datetime.now()
+        self._date_emprunt = date_emprunt or datetime.now()
         
         # date_echeance est calculée automatiquement si non fournie
-        self.__date_echeance = date_echeance or (
-            self.__date_emprunt + timedelta(days=self.DUREE_PAR_DEFAUT)
+        self._date_echeance = date_echeance or (
+            self._date_emprunt + timedelta(days=self.DUREE_PAR_DEFAUT)
         )
         
         # date_retour est None jusqu'à ce que le livre soit retourné
-        self.__date_retour: Optional[datetime] = None
+        self._date_retour: Optional[datetime] = None
 
         # Compteur de renouvellements
-        self.__renouvellements = 0
+        self._renouvellements = 0
+
+        # Forme sérialisée mémorisée une fois l'emprunt retourné (voir data_format)
+        self._donnees_figees: Optional[Dict[str, Any]] = None
 
     # ===================== PROPRIETES (READ-ONLY) =====================
 
     @property
     def id_emprunt(self) -> str:
         """Retourne l'identifiant unique de l'emprunt (immuable)."""
-        return self.__id_emprunt
+        return self._id_emprunt
 
     @property
     def matricule_user(self) -> str:
@@ -120,21 +137,22 @@ class Emprunt:
         if not clean.valider_code_barre(val):
             raise ValueError("Code-barres invalide")
         self._code_barre = val
+        self._donnees_figees = None
 
     @property
     def date_emprunt(self) -> datetime:
         """Retourne la date et heure de l'emprunt (immuable)."""
-        return self.__date_emprunt
+        return self._date_emprunt
 
     @property
     def date_echeance(self) -> datetime:
         """Retourne la date limite de retour (peut être modifiée via renouveler())."""
-        return self.__date_echeance
+        return self._date_echeance
 
     @property
     def date_retour(self) -> Optional[datetime]:
         """Retourne la date et heure du retour, ou None si non encore retourné."""
-        return self.__date_retour
+        return self._date_retour
 
     @property
     def statut(self) -> str:
@@ -150,14 +168,29 @@ class Emprunt:
         Returns:
             str: Le statut courant de l'emprunt
         """
-        if self.__date_retour is not None:
+        return self.statut_au()
+
+    def statut_au(self, maintenant: Optional[datetime] = None) -> str:
+        """
+        Calcule le statut de l'emprunt à l'instant `maintenant`.
+        
+        Permet de lire l'horloge une seule fois pour toute une liste
+        d'emprunts (ex: sauvegarde) au lieu d'une fois par emprunt.
+        
+        Args:
+            maintenant (Optional[datetime]): Instant de référence (défaut: maintenant)
+            
+        Returns:
+            str: "retourne", "en_retard" ou "emprunte" (voir `statut`)
+        """
+        if self._date_retour is not None:
             # Le livre a été retourné, vérifier si en retard
-            if self.__date_retour > self.__date_echeance:
+            if self._date_retour > self._date_echeance:
                 return "en_retard"
             else:
                 return "retourne"
         
-        if datetime.now() > self.__date_echeance:
+        if (maintenant or datetime.now()) > self._date_echeance:
             return "en_retard"
         
         return "emprunte"
@@ -165,12 +198,12 @@ class Emprunt:
     @property
     def renouvellements(self) -> int:
         """Retourne le nombre de fois que cet emprunt a été renouvelé."""
-        return self.__renouvellements
+        return self._renouvellements
 
     # ===================== METHODES LOGIQUES =====================
     # Opérations métier sur l'emprunt
 
-    def est_en_retard(self) -> bool:
+    def est_en_retard(self, maintenant: Optional[datetime] = None) -> bool:
         """
         Vérifie si l'emprunt est actuellement en retard.
         
@@ -178,6 +211,9 @@ class Emprunt:
         - Il n'a pas été retourné ET
         - La date/heure actuelle dépasse la date d'échéance
         
+        Args:
+            maintenant (Optional[datetime]): Instant de référence (défaut: maintenant)
+            
         Returns:
             bool: True si en retard, False sinon
             
@@ -185,9 +221,9 @@ class Emprunt:
             Cette méthode retourne False pour les emprunts déjà retournés,
             utiliser le statut pour déterminer si le retour était en retard.
         """
-        return self.__date_retour is None and datetime.now() > self.__date_echeance
+        return self._date_retour is None and (maintenant or datetime.now()) > self._date_echeance
 
-    def peut_renouveler(self) -> bool:
+    def peut_renouveler(self, maintenant: Optional[datetime] = None) -> bool:
         """
         Vérifie si l'emprunt peut être renouvelé (prolongé).
         
@@ -196,17 +232,20 @@ class Emprunt:
         - L'emprunt n'est pas en retard
         - Le nombre de renouvellements n'a pas atteint la limite (MAX_RENOUVELLEMENTS)
         
+        Args:
+            maintenant (Optional[datetime]): Instant de référence (défaut: maintenant)
+            
         Returns:
             bool: True si l'emprunt peut être renouvelé, False sinon
             
         """
-        if self.__date_retour is not None:
+        if self._date_retour is not None:
             return False  # Déjà retourné, impossible à renouveler
         
-        if self.est_en_retard():
+        if self.est_en_retard(maintenant):
             return False  # En retard, pas de renouvellement autorisé
         
-        return self.__renouvellements < self.MAX_RENOUVELLEMENTS
+        return self._renouvellements < self.MAX_RENOUVELLEMENTS
 
     def renouveler(self, jours: int = 7) -> bool:
         """
@@ -230,10 +269,10 @@ class Emprunt:
             return False
         
         # Ajoute les jours à la date d'échéance
-        self.__date_echeance += timedelta(days=jours)
+        self._date_echeance += timedelta(days=jours)
         
         # Incrémente le compteur
-        self.__renouvellements += 1
+        self._renouvellements += 1
         
         return True
 
@@ -254,16 +293,20 @@ class Emprunt:
             >>> emprunt.retourner()  # Enregistre le retour maintenant
             >>> print(emprunt.statut)  # "retourne" ou "en_retard"
         """
-        self.__date_retour = date_retour or datetime.now()
+        self._date_retour = date_retour or datetime.now()
+        self._donnees_figees = None
 
     # ===================== SERIALISATION / DESERIALISATION =====================
 
-    def data_format(self) -> Dict[str, Any]:
+    def data_format(self, maintenant: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Exporte l'emprunt dans un format sérialisable pour JSON.
         
         Inclut tous les attributs de l'emprunt et des valeurs calculées (statut).
         Les dates sont converties au format ISO 8601.
+        `maintenant` est l'instant utilisé pour calculer le statut (défaut: maintenant).
+        Un emprunt retourné ne change plus : son dictionnaire est mémorisé et
+        réutilisé par les sauvegardes suivantes.
         
         Returns:
             Dict[str, Any]: Dictionnaire contenant:
@@ -278,20 +321,28 @@ class Emprunt:
                 - renouvellements: Nombre de renouvellements
                 
         """
-        return {
-            "id_emprunt": self.id_emprunt,
-            "matricule_user": self.matricule_user,
-            "isbn": self.isbn,
-            "code_barre": self.code_barre,
-            "date_emprunt": self.date_emprunt.isoformat(timespec='seconds'),
-            "date_echeance": self.date_echeance.isoformat(timespec='seconds'),
+        if self._donnees_figees is not None:
+            return self._donnees_figees
+
+        # Lecture directe des slots : pas de passage par les propriétés
+        donnees = {
+            "id_emprunt": self._id_emprunt,
+            "matricule_user": self._matricule_user,
+            "isbn": self._isbn,
+            "code_barre": self._code_barre,
+            "date_emprunt": self._date_emprunt.isoformat(timespec='seconds'),
+            "date_echeance": self._date_echeance.isoformat(timespec='seconds'),
             "date_retour": (
-                self.date_retour.isoformat(timespec='seconds')
-                if self.date_retour else None
+                self._date_retour.isoformat(timespec='seconds')
+                if self._date_retour else None
             ),
-            "statut": self.statut,  # Valeur calculée au moment de la sérialisation
-            "renouvellements": self.renouvellements
+            "statut": self.statut_au(maintenant),  # Valeur calculée au moment de la sérialisation
+            "renouvellements": self._renouvellements
         }
+        # Le statut d'un emprunt retourné ne dépend plus de l'horloge
+        if self._date_retour is not None:
+            self._donnees_figees = donnees
+        return donnees
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Emprunt":
@@ -341,20 +392,23 @@ class Emprunt:
         emprunt = cls.__new__(cls)
         
         # Restauration de l'ID original depuis les données
-        emprunt.__id_emprunt = data["id_emprunt"]
+        emprunt._id_emprunt = data["id_emprunt"]
         
        
-        emprunt._matricule_user = data["matricule_user"]
-        emprunt._isbn = data["isbn"]
+        # Matricules et ISBN se répètent d'un emprunt à l'autre et servent de clés
+        # aux index et aux statistiques : une seule chaîne partagée par valeur
+        emprunt._matricule_user = sys.intern(data["matricule_user"])
+        emprunt._isbn = sys.intern(data["isbn"])
         emprunt._code_barre = code_barre
         
         # Restauration des dates
-        emprunt.__date_emprunt = date_emprunt
-        emprunt.__date_echeance = date_echeance
-        emprunt.__date_retour = date_retour
+        emprunt._date_emprunt = date_emprunt
+        emprunt._date_echeance = date_echeance
+        emprunt._date_retour = date_retour
         
         # Restauration du compteur de renouvellements
-        emprunt.__renouvellements = int(data.get("renouvellements", 0))
+        emprunt._renouvellements = int(data.get("renouvellements", 0))
+        emprunt._donnees_figees = None
 
         return emprunt
 
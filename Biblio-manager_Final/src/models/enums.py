@@ -1,3 +1,4 @@
+import sys
 from enum import Enum
 
 class TypeUtilisateur(Enum):
@@ -13,6 +14,17 @@ class TypeUtilisateur(Enum):
         return self.label
 
 
+# Libellés affichés des statuts, construits une seule fois
+_LIBELLES_STATUT = {
+    "disponible": "Disponible",
+    "emprunte": "Emprunté",
+    "reserve": "Réservé",
+    "perdu": "Perdu",
+    "endommage": "Endommagé",
+    "indisponible": "Indisponible"
+}
+
+
 class StatutLivre(Enum):
     DISPONIBLE = "disponible"
     EMPRUNTE = "emprunte"
@@ -21,21 +33,22 @@ class StatutLivre(Enum):
     ENDOMMAGE = "endommage"
     INDISPONIBLE = "indisponible"
 
+    def __init__(self, valeur: str):
+        # Texte affiché calculé une seule fois par membre : str() et label
+        # renvoient toujours le même objet chaîne au lieu de reconstruire le libellé
+        self._texte = sys.intern(_LIBELLES_STATUT.get(valeur, valeur.capitalize()))
+
     @property
     def label(self) -> str:
         """Retourne une version lisible pour l'utilisateur."""
-        labels = {
-            "disponible": "Disponible",
-            "emprunte": "Emprunté",
-            "reserve": "Réservé",
-            "perdu": "Perdu",
-            "endommage": "Endommagé",
-            "indisponible": "Indisponible"
-        }
-        return labels.get(self.value, self.value.capitalize())
+        return self._texte
 
     def __str__(self):
-        return self.label
+        return self._texte
+
+
+# Recherche valeur -> membre sans passer par l'appel StatutLivre(valeur)
+STATUTS_PAR_VALEUR = {statut.value: statut for statut in StatutLivre}
 
 
 class CategorieLivre(Enum):
@@ -46,9 +59,10 @@ class CategorieLivre(Enum):
     IA = "Intelligence Artificielle"
     AUTRE = "Autre"
 
+    # _value_ est l'attribut de l'instance : évite le descripteur `value` d'Enum
     @property
     def label(self) -> str:
-        return self.value
+        return self._value_
 
     def __str__(self):
-        return self.value
\ No newline at end of file
+        return self._value_
@@ -12,7 +12,11 @@ from datetime import datetime
 from typing import Optional
 from utils import clean
 from utils.generateur import generer_id_unique
-from models.enums import StatutLivre
+from models.enums import StatutLivre, STATUTS_PAR_VALEUR
+
+
+# Valeurs acceptées par le setter `statut` : chaîne ou membre -> membre (une seule recherche)
+_STATUTS_ACCEPTES = {**STATUTS_PAR_VALEUR, **{statut: statut for statut in StatutLivre}}
 
 
 class Exemplaire:
@@ -29,6 +33,18 @@ class Exemplaire:
     - `date_acquisition` : date d'acquisition (datetime)
     """
 
+    # Attributs fixes : pas de __dict__ par instance (un par copie physique du catalogue)
+    __slots__ = (
+        "_id_exemplaire",
+        "_code_barre",
+        "_etat",
+        "_localisation",
+        "_statut",
+        "_date_acquisition",
+        "_date_acquisition_iso",
+        "_livre",
+    )
+
     def __init__(
         self,
         code_barre: Optional[str] = None,
@@ -38,7 +54,7 @@ class Exemplaire:
         date_acquisition: Optional[datetime] = None
     ):
         # Identifiant interne unique pour chaque exemplaire
-        self.__id_exemplaire = generer_id_unique("EX")
+        self._id_exemplaire = generer_id_unique("EX")
 
         # Le code-barres est obligatoire et doit être validé
         if code_barre is None:
@@ -46,23 +62,29 @@ class Exemplaire:
         if not clean.valider_code_barre(code_barre):
             raise ValueError("Code-barres invalide")
 
+        # Livre propriétaire, prévenu quand l'exemplaire devient (in)disponible
+        self._livre = None
+        self._statut = None
+
         # Affectations via les setters pour bénéficier des validations
-        self.__code_barre = code_barre
+        self._code_barre = code_barre
         self.etat = etat
         self.localisation = localisation
         self.statut = statut
         # Date d'acquisition 
-        self.__date_acquisition = date_acquisition or datetime.now()
+        self._date_acquisition = date_acquisition or datetime.now()
+        # Date immuable : sa forme ISO est calculée une fois pour toutes les sauvegardes
+        self._date_acquisition_iso = self._date_acquisition.isoformat()
 
     @property
     def id_exemplaire(self) -> str:
         """Identifiant interne immuable de l'exemplaire."""
-        return self.__id_exemplaire
+        return self._id_exemplaire
 
     @property
     def code_barre(self) -> str:
         """Retourne le code-barres de l'exemplaire."""
-        return self.__code_barre
+        return self._code_barre
 
     @code_barre.setter
     def code_barre(self, val: str):
@@ -71,33 +93,33 @@ class Exemplaire:
         Utilise `utils.clean.nettoyer_chaine` pour vérifier la valeur.
         """
         if clean.nettoyer_chaine(val):
-            self.__code_barre = val
+            self._code_barre = val
         else:
             raise ValueError("Code barre invalide")
 
     @property
     def etat(self) -> str:
         """État physique (chaîne) de l'exemplaire."""
-        return self.__etat
+        return self._etat
 
     @etat.setter
     def etat(self, val: str):
         """Valide et met à jour l'état physique."""
         if clean.nettoyer_chaine(val):
-            self.__etat = val
+            self._etat = val
         else:
             raise ValueError("État invalide")
 
     @property
     def localisation(self) -> str:
         """Emplacement courant de l'exemplaire."""
-        return self.__localisation
+        return self._localisation
 
     @localisation.setter
     def localisation(self, val: str):
         """Valide et met à jour la localisation."""
         if clean.nettoyer_chaine(val):
-            self.__localisation = val
+            self._localisation = val
         else:
             raise ValueError("Localisation invalide")
 
@@ -108,32 +130,63 @@ class Exemplaire:
         Utile pour sérialisation (ex: JSON) où l'on souhaite une valeur
         lisible plutôt que l'enum.
         """
-        return self.__statut.value
+        return self._statut.value
 
     @statut.setter
     def statut(self, val):
         """Accepte soit un `StatutLivre`, soit une chaîne correspondant
         à une valeur de l'énumération.
         """
-        if isinstance(val, StatutLivre):
-            self.__statut = val
-        elif isinstance(val, str):
-            try:
-                self.__statut = StatutLivre(val)
-            except ValueError:
+        try:
+            statut = _STATUTS_ACCEPTES.get(val)
+        except TypeError:
+            # Valeur non hachable : ni chaîne ni StatutLivre
+            statut = None
+        if statut is None:
+            if isinstance(val, str):
                 raise ValueError(f"Statut invalide : {val}")
-        else:
             raise ValueError("Le statut doit être une chaîne ou un StatutLivre")
 
+        etait_disponible = self._statut is StatutLivre.DISPONIBLE
+        self._statut = statut
+        if self._livre is not None and etait_disponible != (statut is StatutLivre.DISPONIBLE):
+            self._livre._disponibilite_modifiee(self, -1 if etait_disponible else 1)
+
+    def _rattacher(self, livre) -> None:
+        """Enregistre le `Livre` propriétaire (ou `None` une fois retiré)."""
+        self._livre = livre
+
     @property
     def statut_enum(self) -> StatutLivre:
         """Retourne le statut sous forme d'`enum` pour la logique métier."""
-        return self.__statut
+        return self._statut
 
     @property
     def date_acquisition(self) -> datetime:
         """Date d'acquisition de l'exemplaire."""
-        return self.__date_acquisition
+        return self._date_acquisition
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Exemplaire":
+        """Reconstruit un exemplaire lu dans `livres.json` sans repasser par les setters.
+
+        Seuls le code-barres (KeyError s'il manque) et le statut (ValueError
+        s'il est inconnu) sont contrôlés : le fichier n'est écrit qu'à partir
+        d'exemplaires déjà validés.
+        """
+        statut = STATUTS_PAR_VALEUR.get(data.get("statut", "disponible"))
+        if statut is None:
+            raise ValueError(f"Statut invalide : {data.get('statut')}")
+        exemplaire = cls.__new__(cls)
+        exemplaire._id_exemplaire = generer_id_unique("EX")
+        exemplaire._code_barre = data["code_barre"]
+        exemplaire._etat = data.get("etat", "bon")
+        exemplaire._localisation = data.get("localisation", "stock")
+        exemplaire._statut = statut
+        exemplaire._livre = None
+        exemplaire._date_acquisition = datetime.now()
+        exemplaire._date_acquisition_iso = exemplaire._date_acquisition.isoformat()
+        return exemplaire
 
     def data_format(self) -> dict:
 
@@ -143,7 +196,7 @@ class Exemplaire:
             "etat": self.etat,
             "localisation": self.localisation,
             "statut": self.statut,
-            "date_acquisition": self.date_acquisition.isoformat()
+            "date_acquisition": self._date_acquisition_iso
         }
 
     def __str__(self) -> str:
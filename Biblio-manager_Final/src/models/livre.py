@@ -7,9 +7,10 @@ que la gestion des exemplaires associés, le calcul du statut
 recherche et la sérialisation.
 """
 
+import sys
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import utils.clean as clean
 from models.enums import StatutLivre, CategorieLivre
 from models.exemplaire import Exemplaire
@@ -29,6 +30,32 @@ class Livre:
     compteurs/statuts utiles pour la logique métier.
     """
 
+    # Attributs fixes : pas de __dict__ par instance (tout le catalogue est chargé en mémoire)
+    __slots__ = (
+        "_id_livre",
+        "_isbn",
+        "_titre",
+        "_auteur",
+        "_editeur",
+        "_annee_publication",
+        "_categorie",
+        "_mots_cles",
+        "_texte_recherche",
+        "_champs_recherche",
+        "_exemplaires",
+        "_par_code_barre",
+        "_nb_disponibles",
+        "_statut",
+        "_compteur_emprunts",
+        "_date_ajout",
+        "_date_ajout_iso",
+        "_texte",
+    )
+
+    # Nombre de changements d'ISBN depuis le lancement (lecture seule hors de la classe) :
+    # permet aux index par ISBN de savoir qu'ils doivent être reconstruits
+    revision_isbn = 0
+
     def __init__(
         self,
         isbn: str,
@@ -56,7 +83,7 @@ class Livre:
             raise ValueError("Mots cles invalides")
 
         # === ATTRIBUTS METIER ===
-        self.__id_livre = generer_id_unique("LIV")
+        self._id_livre = generer_id_unique("LIV")
         self._isbn = isbn
         self._titre = titre
         self._auteur = auteur
@@ -64,13 +91,25 @@ class Livre:
         self._annee_publication = annee_publication
         self._categorie = categorie
         self._mots_cles = mots_cles or []
+        # Texte de recherche et champs en minuscules, reconstruits à la demande (voir rechercher)
+        self._texte_recherche: Optional[str] = None
+        self._champs_recherche: Optional[Tuple[str, str, str]] = None
 
         # Liste privée d'objets Exemplaire
-        self.__exemplaires: List[Exemplaire] = []
+        self._exemplaires: List[Exemplaire] = []
+        # Index code-barres -> exemplaire (le premier ajouté l'emporte)
+        self._par_code_barre: Dict[str, Exemplaire] = {}
+        # Nombre d'exemplaires DISPONIBLE, tenu à jour par les exemplaires rattachés
+        self._nb_disponibles = 0
         # Statut métier (enum StatutLivre)
-        self.__statut = StatutLivre.INDISPONIBLE
-        self.__compteur_emprunts = 0
-        self.__date_ajout = datetime.now()
+        self._statut = StatutLivre.INDISPONIBLE
+        self._compteur_emprunts = 0
+        self._date_ajout = datetime.now()
+        # Date immuable : sa forme ISO est calculée une fois pour toutes les sauvegardes
+        self._date_ajout_iso = self._date_ajout.isoformat()
+        # Représentation texte (voir __str__), recalculée par les setters isbn/titre/auteur
+        self._texte = None
+        self._maj_texte()
 
         # Met à jour le statut initial en fonction des exemplaires
         self.mettre_a_jour_statut()
@@ -81,7 +120,7 @@ class Livre:
     @property
     def id(self) -> str:
         """Identifiant interne généré automatiquement."""
-        return self.__id_livre
+        return self._id_livre
 
     @property
     def isbn(self) -> str:
@@ -92,7 +131,10 @@ class Livre:
     def isbn(self, isbn: str):
         """Met à jour l'ISBN après validation."""
         if clean.valider_isbn(isbn):
+            if isbn != self._isbn:
+                Livre.revision_isbn += 1
             self._isbn = isbn
+            self._maj_texte()
         else:
             raise ValueError("ISBN invalide")
 
@@ -106,6 +148,8 @@ class Livre:
         """Met à jour le titre si la chaîne est valide."""
         if clean.nettoyer_chaine(titre):
             self._titre = titre
+            self._texte_recherche = None
+            self._maj_texte()
         else:
             raise ValueError("Titre invalide")
 
@@ -119,6 +163,8 @@ class Livre:
         """Met à jour l'auteur après validation."""
         if clean.nettoyer_chaine(auteur):
             self._auteur = auteur
+            self._texte_recherche = None
+            self._maj_texte()
         else:
             raise ValueError("Auteur invalide")
 
@@ -132,6 +178,7 @@ class Livre:
         """Met à jour l'éditeur après validation."""
         if clean.nettoyer_chaine(editeur):
             self._editeur = editeur
+            self._texte_recherche = None
         else:
             raise ValueError("Editeur invalide")
 
@@ -171,6 +218,7 @@ class Livre:
         """Met à jour les mots-clés après validation."""
         if clean.valider_mots_cles(mots_cles):
             self._mots_cles = mots_cles
+            self._texte_recherche = None
         else:
             raise ValueError("Mots cles invalides")
 
@@ -180,32 +228,36 @@ class Livre:
     @property
     def nombre_exemplaires(self) -> int:
         """Nombre total d'exemplaires associés à ce livre."""
-        return len(self.__exemplaires)
+        return len(self._exemplaires)
 
     @property
     def exemplaires_disponibles(self) -> int:
         """Compte des exemplaires ayant le statut `DISPONIBLE`."""
-        return sum(1 for ex in self.__exemplaires if ex.statut_enum == StatutLivre.DISPONIBLE)
+        return self._nb_disponibles
 
     @property
     def statut(self) -> StatutLivre:
         """Statut courant du livre (énumération)."""
-        return self.__statut
+        return self._statut
 
     @property
     def compteur_emprunts(self) -> int:
         """Compteur d'emprunts pour ce titre (statistique simple)."""
-        return self.__compteur_emprunts
+        return self._compteur_emprunts
 
     @property
     def date_ajout(self) -> datetime:
         """Date d'ajout du livre dans le catalogue."""
-        return self.__date_ajout
+        return self._date_ajout
 
     @property
     def exemplaires(self) -> List[Exemplaire]:
         """Renvoie une copie de la liste d'exemplaires (préserve l'encapsulation)."""
-        return list(self.__exemplaires)
+        return list(self._exemplaires)
+
+    def iter_exemplaires(self) -> Iterator[Exemplaire]:
+        """Parcourt les exemplaires sans copier la liste (lecture seule, ne pas ajouter/retirer pendant le parcours)."""
+        return iter(self._exemplaires)
 
     # ======================
     # GESTION DES EXEMPLAIRES
@@ -219,7 +271,11 @@ class Livre:
         """
         if exemplaire is None:
             exemplaire = Exemplaire()
-        self.__exemplaires.append(exemplaire)
+        self._exemplaires.append(exemplaire)
+        self._par_code_barre.setdefault(exemplaire.code_barre, exemplaire)
+        exemplaire._rattacher(self)
+        if exemplaire.statut_enum is StatutLivre.DISPONIBLE:
+            self._nb_disponibles += 1
         self.mettre_a_jour_statut()
         return exemplaire
 
@@ -228,12 +284,30 @@ class Livre:
 
         Retourne `True` si la suppression a eu lieu, `False` sinon.
         """
-        for ex in self.__exemplaires:
-            if ex.code_barre == code_barre:
-                self.__exemplaires.remove(ex)
-                self.mettre_a_jour_statut()
-                return True
-        return False
+        ex = self._par_code_barre.pop(code_barre, None)
+        if ex is None or ex.code_barre != code_barre:
+            # Absent de l'index (doublon déjà retiré, code-barres modifié) : parcours complet
+            ex = next((e for e in self._exemplaires if e.code_barre == code_barre), None)
+            if ex is None:
+                return False
+        self._exemplaires.remove(ex)
+        ex._rattacher(None)
+        if ex.statut_enum is StatutLivre.DISPONIBLE:
+            self._nb_disponibles -= 1
+        self.mettre_a_jour_statut()
+        return True
+
+    def get_exemplaire(self, code_barre: str) -> Optional[Exemplaire]:
+        """Retourne l'exemplaire portant exactement `code_barre`, ou `None`."""
+        ex = self._par_code_barre.get(code_barre)
+        if ex is not None and ex.code_barre == code_barre:
+            return ex
+        # Absent de l'index (doublon, code-barres modifié) : parcours complet
+        return next((e for e in self._exemplaires if e.code_barre == code_barre), None)
+
+    def _disponibilite_modifiee(self, exemplaire: Exemplaire, delta: int) -> None:
+        """Appelé par un exemplaire rattaché qui devient (+1) ou cesse d'être (-1) disponible."""
+        self._nb_disponibles += delta
 
     def mettre_a_jour_statut(self):
         """Met à jour le statut du livre en fonction des exemplaires.
@@ -243,44 +317,91 @@ class Livre:
         - Au moins un exemplaire disponible -> DISPONIBLE
         - Exemplaires présents mais aucun disponible -> EMPRUNTE
         """
-        if self.nombre_exemplaires == 0:
-            self.__statut = StatutLivre.INDISPONIBLE
-        elif self.exemplaires_disponibles > 0:
-            self.__statut = StatutLivre.DISPONIBLE
+        if not self._exemplaires:
+            self._statut = StatutLivre.INDISPONIBLE
+        elif self._nb_disponibles > 0:
+            self._statut = StatutLivre.DISPONIBLE
         else:
             # Exemplaires présents, mais tous empruntés/réservés
-            self.__statut = StatutLivre.EMPRUNTE
+            self._statut = StatutLivre.EMPRUNTE
 
     # ======================
     # LOGIQUE METIER
     # ======================
     def incrementer_compteur(self):
         """Incrémente le compteur d'emprunts pour ce livre."""
-        self.__compteur_emprunts += 1
+        self._compteur_emprunts += 1
 
     def est_disponible(self) -> bool:
         """Retourne True si au moins un exemplaire est disponible."""
         return self.exemplaires_disponibles > 0
 
     def prochain_exemplaire(self) -> Optional[Exemplaire]:
-        """Renvoie le premier exemplaire disponible ou `None` s'il n'y en a pas."""
-        for ex in self.__exemplaires:
-            if ex.statut_enum == StatutLivre.DISPONIBLE:
+        """Renvoie le premier exemplaire disponible (ordre de la liste) ou `None`.
+
+        Le compteur de disponibilités évite tout parcours quand aucun
+        exemplaire n'est disponible.
+        """
+        if self._nb_disponibles <= 0:
+            return None
+        for ex in self._exemplaires:
+            if ex.statut_enum is StatutLivre.DISPONIBLE:
                 return ex
         return None
 
+    def _preparer_recherche(self) -> None:
+        """Calcule les champs en minuscules et le texte de recherche complet."""
+        champs = (self._titre.lower(), self._auteur.lower(), self._editeur.lower())
+        self._champs_recherche = champs
+        # Champs séparés par un saut de ligne (absent des saisies) pour
+        # qu'un mot ne puisse pas correspondre à cheval sur deux champs
+        self._texte_recherche = "\n".join((*champs, *self._mots_cles)).lower()
+
+    def champs_recherche(self) -> Tuple[str, str, str]:
+        """Retourne (titre, auteur, éditeur) en minuscules, calculés une seule fois."""
+        if self._texte_recherche is None:
+            self._preparer_recherche()
+        return self._champs_recherche
+
     def rechercher(self, mot_cle: str) -> bool:
         """Recherche si `mot_cle` est présent dans le titre, l'auteur, l'éditeur
         ou les mots-clés. La recherche est insensible à la casse.
         """
-        mot = mot_cle.lower()
-        if (
-            mot in self.titre.lower()
-            or mot in self.auteur.lower()
-            or mot in self.editeur.lower()
-        ):
-            return True
-        return any(mot in mc.lower() for mc in self.mots_cles)
+        if self._texte_recherche is None:
+            self._preparer_recherche()
+        return mot_cle.lower() in self._texte_recherche
+
+    @classmethod
+    def from_dict(cls, data: dict, categorie: CategorieLivre) -> "Livre":
+        """Reconstruit un livre lu dans `livres.json` sans repasser par les validations.
+
+        Le fichier n'est écrit qu'à partir de livres déjà validés : seule la
+        présence des champs obligatoires est vérifiée (KeyError sinon). La
+        catégorie est résolue par l'appelant ; les exemplaires sont ajoutés
+        ensuite via `ajouter_exemplaire`.
+        """
+        livre = cls.__new__(cls)
+        livre._id_livre = generer_id_unique("LIV")
+        livre._isbn = data["isbn"]
+        livre._titre = data["titre"]
+        # Auteurs, éditeurs et mots-clés se répètent d'un livre à l'autre :
+        # une seule chaîne partagée pour chaque valeur distincte
+        livre._auteur = sys.intern(data["auteur"])
+        livre._editeur = sys.intern(data["editeur"])
+        livre._annee_publication = int(data.get("annee_publication", 0) or 0)
+        livre._categorie = categorie
+        livre._mots_cles = [sys.intern(mot) for mot in data.get("mots_cles") or []]
+        livre._texte_recherche = None
+        livre._champs_recherche = None
+        livre._exemplaires = []
+        livre._par_code_barre = {}
+        livre._nb_disponibles = 0
+        livre._statut = StatutLivre.INDISPONIBLE
+        livre._compteur_emprunts = 0
+        livre._date_ajout = datetime.now()
+        livre._date_ajout_iso = livre._date_ajout.isoformat()
+        livre._maj_texte()
+        return livre
 
     def data_format(self) -> dict:
         """Sérialise le livre en dictionnaire prêt pour JSON.
@@ -295,12 +416,15 @@ class Livre:
             "annee_publication": self.annee_publication,
             "categorie": self.categorie.name,
             "mots_cles": self.mots_cles,
-            "date_ajout": self.date_ajout.isoformat(),
-            "exemplaires": [ex.data_format() for ex in self.exemplaires]
+            "date_ajout": self._date_ajout_iso,
+            "exemplaires": [ex.data_format() for ex in self._exemplaires]
         }
 
+    def _maj_texte(self) -> None:
+        self._texte = f"{self._id_livre}-{self._titre} | {self._auteur} | ISBN: {self._isbn}"
+
     def __str__(self):
-        return f"{self.id}-{self.titre} | {self.auteur} | ISBN: {self.isbn}"
+        return self._texte
 
     def __repr__(self):
         return self.__str__()
\ No newline at end of file
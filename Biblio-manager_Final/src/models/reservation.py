@@ -1,7 +1,11 @@
+import sys
 from datetime import datetime
 from typing import Optional, Dict, Any
 from utils.generateur import generer_id_unique
 
+# Statuts acceptés, consultés à chaque création ou rechargement de réservation
+_STATUTS_VALIDES = frozenset(("en_attente", "notifie", "confirme", "annule"))
+
 
 class Reservation:
     """Représente une réservation d'un utilisateur pour un ISBN.
@@ -19,7 +23,18 @@ class Reservation:
     STATUT_CONFIRME = "confirme"
     STATUT_ANNULE = "annule"
 
-    STATUTS_VALIDES = {STATUT_EN_ATTENTE, STATUT_NOTIFIE, STATUT_CONFIRME, STATUT_ANNULE}
+    STATUTS_VALIDES = _STATUTS_VALIDES
+
+    # Attributs fixes : pas de __dict__ par instance
+    __slots__ = (
+        "_id",
+        "_matricule_user",
+        "_isbn",
+        "_date_reservation",
+        "_date_reservation_iso",
+        "_statut",
+        "_donnees",
+    )
 
     def __init__(
         self,
@@ -33,76 +48,89 @@ class Reservation:
             raise ValueError("Le matricule utilisateur est requis")
         if not isbn:
             raise ValueError("L'ISBN est requis")
-        if statut not in self.STATUTS_VALIDES:
+        if statut not in _STATUTS_VALIDES:
             raise ValueError(f"Statut invalide : {statut}")
 
-        self.__id = id_reservation or generer_id_unique("RES")
-        self.__matricule_user = matricule_user
-        self.__isbn = isbn
-        self.__date_reservation = date_reservation or datetime.now()
-        self.__statut = statut
+        self._id = id_reservation or generer_id_unique("RES")
+        self._matricule_user = matricule_user
+        self._isbn = isbn
+        self._date_reservation = date_reservation or datetime.now()
+        # Date immuable : sa forme ISO est calculée une fois pour toutes les sauvegardes
+        self._date_reservation_iso = self._date_reservation.isoformat()
+        self._statut = statut
+        # Forme sérialisée mémorisée, invalidée à chaque changement d'état
+        self._donnees: Optional[Dict[str, Any]] = None
 
     # --- Propriétés (lecture seule) ---
 
     @property
     def id(self) -> str:
-        return self.__id
+        return self._id
 
     @property
     def matricule_user(self) -> str:
-        return self.__matricule_user
+        return self._matricule_user
 
     @property
     def isbn(self) -> str:
-        return self.__isbn
+        return self._isbn
 
     @property
     def date_reservation(self) -> datetime:
-        return self.__date_reservation
+        return self._date_reservation
 
     @property
     def statut(self) -> str:
-        return self.__statut
+        return self._statut
 
     # --- Changer d'état ---
 
     def notifier(self) -> None:
         """Passe la réservation à l'état 'notifie'."""
-        if self.__statut != self.STATUT_EN_ATTENTE:
+        if self._statut != self.STATUT_EN_ATTENTE:
             raise ValueError("Seules les réservations 'en_attente' peuvent être notifiées")
-        self.__statut = self.STATUT_NOTIFIE
+        self._statut = self.STATUT_NOTIFIE
+        self._donnees = None
 
     def confirmer(self) -> None:
         """Passe la réservation à l'état 'confirme'."""
-        if self.__statut != self.STATUT_NOTIFIE:
+        if self._statut != self.STATUT_NOTIFIE:
             raise ValueError("Seules les réservations 'notifie' peuvent être confirmées")
-        self.__statut = self.STATUT_CONFIRME
+        self._statut = self.STATUT_CONFIRME
+        self._donnees = None
 
     def annuler(self) -> None:
         """Passe la réservation à l'état 'annule' (opération irréversible)."""
-        if self.__statut == self.STATUT_ANNULE:
+        if self._statut == self.STATUT_ANNULE:
             return  # déjà annulé
-        self.__statut = self.STATUT_ANNULE
+        self._statut = self.STATUT_ANNULE
+        self._donnees = None
 
     def est_notifiable(self) -> bool:
         """Indique si la réservation est éligible à une notification."""
-        return self.__statut == self.STATUT_EN_ATTENTE
+        return self._statut == self.STATUT_EN_ATTENTE
 
     def est_confirmable(self) -> bool:
         """Indique si la réservation peut être confirmée."""
-        return self.__statut == self.STATUT_NOTIFIE
+        return self._statut == self.STATUT_NOTIFIE
 
     # --- Sérialisation ---
 
     def data_format(self) -> Dict[str, Any]:
-        """Exporte la réservation au format sérialisable (JSON)."""
-        return {
-            "id_reservation": self.id,
-            "matricule_user": self.matricule_user,
-            "isbn": self.isbn,
-            "date_reservation": self.date_reservation.isoformat(),
-            "statut": self.statut,
-        }
+        """Exporte la réservation au format sérialisable (JSON).
+
+        Le dictionnaire est mémorisé jusqu'au prochain changement d'état :
+        il est partagé et donc à consulter en lecture seule.
+        """
+        if self._donnees is None:
+            self._donnees = {
+                "id_reservation": self._id,
+                "matricule_user": self._matricule_user,
+                "isbn": self._isbn,
+                "date_reservation": self._date_reservation_iso,
+                "statut": self._statut,
+            }
+        return self._donnees
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Reservation":
@@ -116,16 +144,29 @@ class Reservation:
                 date = None
 
         statut = data.get("statut", cls.STATUT_EN_ATTENTE)
-        if statut not in cls.STATUTS_VALIDES:
+        if statut not in _STATUTS_VALIDES:
             statut = cls.STATUT_EN_ATTENTE
 
-        return cls(
-            matricule_user=data.get("matricule_user", ""),
-            isbn=data.get("isbn", ""),
-            date_reservation=date,
-            statut=statut,
-            id_reservation=data.get("id_reservation"),
-        )
+        matricule_user = data.get("matricule_user", "")
+        isbn = data.get("isbn", "")
+        if not matricule_user:
+            raise ValueError("Le matricule utilisateur est requis")
+        if not isbn:
+            raise ValueError("L'ISBN est requis")
+
+        # Création sans passer par __init__ (statut déjà validé ci-dessus),
+        # comme Emprunt.from_dict : le chargement reconstruit toutes les réservations
+        reservation = cls.__new__(cls)
+        reservation._id = data.get("id_reservation") or generer_id_unique("RES")
+        # Partagés avec les emprunts et les index par matricule / par ISBN
+        reservation._matricule_user = sys.intern(matricule_user)
+        reservation._isbn = sys.intern(isbn)
+        reservation._date_reservation = date or datetime.now()
+        reservation._date_reservation_iso = reservation._date_reservation.isoformat()
+        # Chaîne lue dans le JSON : internée pour partager un seul objet par statut
+        reservation._statut = sys.intern(statut)
+        reservation._donnees = None
+        return reservation
 
     # --- Affichage ---
 
@@ -1,3 +1,4 @@
+import sys
 from datetime import datetime
 from typing import Optional, List
 from utils.generateur import generer_id_unique
@@ -6,6 +7,18 @@ from models.enums import TypeUtilisateur
 
 
 class Personne:
+    # Attributs fixes : pas de __dict__ par instance (complétés par ceux de User)
+    __slots__ = (
+        "_id_personne",
+        "_nom",
+        "_prenom",
+        "_email",
+        "_telephone",
+        "_date_inscription",
+        "_date_inscription_iso",
+        "_nom_complet",
+    )
+
     def __init__(
         self,
         nom: str,
@@ -23,65 +36,71 @@ class Personne:
         if not clean.valider_telephone(telephone):
             raise ValueError("Téléphone invalide")
 
-        self.__id_personne = generer_id_unique("P")
-        self.__nom = nom
-        self.__prenom = prenom
-        self.__email = email
-        self.__telephone = telephone
-        self.__date_inscription = date_inscription or datetime.now()
+        self._id_personne = generer_id_unique("P")
+        self._nom = nom
+        self._prenom = prenom
+        # "Prénom Nom", recalculé seulement quand le nom ou le prénom change
+        self._nom_complet = f"{prenom} {nom}"
+        self._email = email
+        self._telephone = telephone
+        self._date_inscription = date_inscription or datetime.now()
+        # Date immuable : sa forme ISO est calculée une fois pour toutes les sauvegardes
+        self._date_inscription_iso = self._date_inscription.isoformat()
 
     @property
     def id_personne(self):
-        return self.__id_personne
+        return self._id_personne
     
     @property
     def date_inscription(self):
-        return self.__date_inscription
+        return self._date_inscription
     
     @property
     def nom(self):
-        return self.__nom
+        return self._nom
 
     @nom.setter
     def nom(self, value: str):
         if not clean.nettoyer_chaine(value):
             raise ValueError("Nom invalide")
-        self.__nom = value
+        self._nom = value
+        self._nom_complet = f"{self._prenom} {value}"
 
     @property
     def prenom(self):
-        return self.__prenom
+        return self._prenom
 
     @prenom.setter
     def prenom(self, value: str):
         if not clean.nettoyer_chaine(value):
             raise ValueError("Prénom invalide")
-        self.__prenom = value
+        self._prenom = value
+        self._nom_complet = f"{value} {self._nom}"
 
     @property
     def email(self):
-        return self.__email
+        return self._email
 
     @email.setter
     def email(self, value: str):
         if not clean.valider_email(value):
             raise ValueError("Email invalide")
-        self.__email = value
+        self._email = value
 
     @property
     def telephone(self):
-        return self.__telephone
+        return self._telephone
 
     @telephone.setter
     def telephone(self, value: str):
         if not clean.valider_telephone(value):
             raise ValueError("Téléphone invalide")
-        self.__telephone = value
+        self._telephone = value
 
 
 
     def nom_complet(self) -> str:
-        return f"{self.__prenom} {self.__nom}"
+        return self._nom_complet
 
     def data_format(self) -> dict:
         return {
@@ -90,7 +109,7 @@ class Personne:
             "prenom": self.prenom,
             "email": self.email,
             "telephone": self.telephone,
-            "date_inscription": self.date_inscription.isoformat()
+            "date_inscription": self._date_inscription_iso
         }
 
     def __str__(self):
@@ -101,6 +120,14 @@ class Personne:
 
 
 class User(Personne):
+    __slots__ = (
+        "_matricule",
+        "_type_utilisateur",
+        "_statut",
+        "_livres_empruntes",
+        "_historique",
+        "_limite_emprunts",
+    )
 
     def __init__(
         self,
@@ -111,39 +138,47 @@ class User(Personne):
         type_utilisateur: TypeUtilisateur = TypeUtilisateur.ETUDIANT
     ):
         super().__init__(nom, prenom, email, telephone)
-        self.__matricule = generer_id_unique("U")
-        self.__type_utilisateur = type_utilisateur
-        self.__statut = "actif"
-        self.__livres_empruntes: List[dict] = []
-        self.__historique: List[dict] = []
-        self.__limite_emprunts = type_utilisateur.limite_emprunt
+        self._matricule = generer_id_unique("U")
+        self._type_utilisateur = type_utilisateur
+        self._statut = "actif"
+        self._livres_empruntes: List[dict] = []
+        self._historique: List[dict] = []
+        self._limite_emprunts = type_utilisateur.limite_emprunt
 
 
     # --------- propriétés ---------
 
     @property
     def matricule(self):
-        return self.__matricule
+        return self._matricule
 
     @property
     def type_utilisateur(self):
-        return self.__type_utilisateur
+        return self._type_utilisateur
+
+    @type_utilisateur.setter
+    def type_utilisateur(self, value: TypeUtilisateur):
+        """Change le type de l'utilisateur et la limite d'emprunts qui en dépend."""
+        if not isinstance(value, TypeUtilisateur):
+            raise ValueError("Type d'utilisateur invalide")
+        self._type_utilisateur = value
+        self._limite_emprunts = value.limite_emprunt
 
     @property
     def statut(self):
-        return self.__statut
+        return self._statut
 
     @property
     def livres_empruntes(self):
-        return list(self.__livres_empruntes)
+        return list(self._livres_empruntes)
 
     @property
     def historique(self):
-        return list(self.__historique)
+        return list(self._historique)
     
     @property
     def limite_emprunts(self) -> int:
-        return self.__limite_emprunts
+        return self._limite_emprunts
 
     # --------- méthodes publiques ---------
 
@@ -151,30 +186,33 @@ class User(Personne):
         """Modifie le statut de l'utilisateur (actif/inactif)."""
         if statut not in ("actif", "inactif"):
             raise ValueError("Le statut doit être 'actif' ou 'inactif'")
-        self.__statut = statut
+        self._statut = statut
 
     def restaurer_etat(self, donnees: dict) -> None:
         """
         Restaure l'état interne de l'utilisateur à partir d'un dictionnaire
          chargé depuis un fichier JSON.
+        Les entrées d'emprunts et d'historique de `donnees` sont reprises telles
+        quelles (dates converties sur place) : le dictionnaire vient de json.load
+        et n'est partagé avec personne.
         
         """
         # Matricule
         if 'matricule' in donnees:
-            self.__matricule = str(donnees['matricule'])
+            self._matricule = str(donnees['matricule'])
 
         # Statut
         if 'statut' in donnees:
             statut = donnees['statut']
             if statut in ("actif", "inactif"):
-                self.__statut = statut
+                self._statut = sys.intern(statut)
 
         # Livres empruntés
         if 'livres_empruntes' in donnees:
             emprunts = donnees['livres_empruntes']
             if isinstance(emprunts, list):
                 # S'assurer que les dates sont bien des objets datetime si présentes
-                self.__livres_empruntes = [
+                self._livres_empruntes = [
                     self._normaliser_date_emprunt(e) for e in emprunts
                 ]
 
@@ -182,31 +220,33 @@ class User(Personne):
         if 'historique' in donnees:
             historique = donnees['historique']
             if isinstance(historique, list):
-                self.__historique = [
+                self._historique = [
                     self._normaliser_date_historique(e) for e in historique
                 ]
 
     def _normaliser_date_emprunt(self, emprunt: dict) -> dict:
-        """Convertit les dates ISO en objets datetime si nécessaire."""
-        emprunt = emprunt.copy()
+        """Convertit sur place les dates ISO en objets datetime si nécessaire."""
         if 'date_emprunt' in emprunt and isinstance(emprunt['date_emprunt'], str):
             emprunt['date_emprunt'] = datetime.fromisoformat(emprunt['date_emprunt'])
         return emprunt
 
     def _normaliser_date_historique(self, entree: dict) -> dict:
-        """Convertit les dates ISO en objets datetime dans l'historique."""
-        entree = entree.copy()
+        """Convertit sur place les dates ISO en objets datetime dans l'historique."""
         for key in ('date_emprunt', 'date_retour'):
             if key in entree and isinstance(entree[key], str):
                 entree[key] = datetime.fromisoformat(entree[key])
+        # "emprunt"/"retour" : une seule chaîne partagée par toutes les entrées chargées
+        action = entree.get('action')
+        if isinstance(action, str):
+            entree['action'] = sys.intern(action)
         return entree
 
     # --------- règles ---------
 
     def peut_emprunter(self) -> bool:
         return (
-            self.__statut == "actif"
-            and len(self.__livres_empruntes) < self.__limite_emprunts
+            self._statut == "actif"
+            and len(self._livres_empruntes) < self._limite_emprunts
         )
 
     def enregistrer_emprunt(self, isbn: str, id_exemplaire: str):
@@ -215,15 +255,17 @@ class User(Personne):
             "id_exemplaire": id_exemplaire,
             "date_emprunt": datetime.now()
         }
-        self.__livres_empruntes.append(info)
-        self.__historique.append({**info, "action": "emprunt"})
+        self._livres_empruntes.append(info)
+        self._historique.append({**info, "action": "emprunt"})
 
     def enregistrer_retour(self, isbn: str, id_exemplaire: str):
-        self.__livres_empruntes = [
-            e for e in self.__livres_empruntes
-            if not (e["isbn"] == isbn and e["id_exemplaire"] == id_exemplaire)
-        ]
-        self.__historique.append({
+        # Suppression sur place, de la fin vers le début : pas de nouvelle liste à chaque retour
+        emprunts = self._livres_empruntes
+        for i in range(len(emprunts) - 1, -1, -1):
+            e = emprunts[i]
+            if e["isbn"] == isbn and e["id_exemplaire"] == id_exemplaire:
+                del emprunts[i]
+        self._historique.append({
             "isbn": isbn,
             "id_exemplaire": id_exemplaire,
             "date_retour": datetime.now(),
@@ -235,14 +277,14 @@ class User(Personne):
         data = super().data_format()
         # On convertit les dates en chaînes ISO pour la sauvegarde
         livres_serial = []
-        for e in self.__livres_empruntes:
+        for e in self._livres_empruntes:
             e_copy = e.copy()
             if 'date_emprunt' in e_copy and isinstance(e_copy['date_emprunt'], datetime):
                 e_copy['date_emprunt'] = e_copy['date_emprunt'].isoformat()
             livres_serial.append(e_copy)
 
         historique_serial = []
-        for h in self.__historique:
+        for h in self._historique:
             h_copy = h.copy()
             for key in ('date_emprunt', 'date_retour'):
                 if key in h_copy and isinstance(h_copy[key], datetime):
@@ -8,20 +8,18 @@ et les suspensions sont persistés dans `data/emprunts.json`.
 
 import os
 import json
+import heapq
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, TYPE_CHECKING
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from models.emprunt import Emprunt
 from models.livre import Livre
 from models.exemplaire import Exemplaire
 from models.user import User
 from models.enums import StatutLivre
-from services.journal import enregistrer_action
-
-if TYPE_CHECKING:
-    from services.gestion_livre import GestionLivre
-    from services.gestion_user import GestionUtilisateur
-    from services.gestion_reservation import GestionReservation
+from services.journal import enregistrer_action, vider_journal
+from services.registre import Services
 
 
 def get_data_file(filename: str) -> str:
@@ -40,6 +38,8 @@ def get_data_file(filename: str) -> str:
 
 
 DATA_FILE = get_data_file('emprunts.json')
+# Le dossier de données est créé une fois, au chargement du module
+os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
 
 
 class EmpruntError(Exception):
@@ -67,13 +67,33 @@ class GestionEmprunt:
 
     FACTEUR_SUSPENSION = 3  # multiplier le nombre de jours de retard pour la suspension
 
-    def __init__(self, gestion_livre: 'GestionLivre', gestion_user: 'GestionUtilisateur', gestion_reservation: 'GestionReservation'):
-        """Initialise les structures en mémoire et charge les emprunts persistés."""
-        self._gestion_livre = gestion_livre
-        self._gestion_user = gestion_user
-        self._gestion_reservation = gestion_reservation
+    def __init__(self, services: Services):
+        """Initialise les structures en mémoire et charge les emprunts persistés.
+
+        `services` doit contenir les gestionnaires de livres et d'utilisateurs
+        (et, si disponible, celui des réservations).
+        """
+        self._services = services
         self.__emprunts: Dict[str, Emprunt] = {}
+        # Index tenus à jour avec __emprunts (des dict pour garder l'ordre d'insertion) :
+        # emprunts par matricule, et emprunts non retournés
+        self._par_user: Dict[str, Dict[str, Emprunt]] = {}
+        self._en_cours: Dict[str, Emprunt] = {}
+        # Tas (échéance, id) des emprunts en cours ; les entrées périmées (emprunt
+        # retourné ou renouvelé depuis) sont écartées quand elles remontent
+        self._echeances: List[Tuple[datetime, str]] = []
+        # Rang d'insertion de chaque emprunt dans __emprunts : `appliquer_penalites`
+        # applique les suspensions dans cet ordre (la dernière l'emporte)
+        self._rangs: Dict[str, int] = {}
+        # Fin de suspension par matricule : chaîne ISO (sauvegardée) et datetime
+        # déjà analysé (comparaisons), toujours modifiés ensemble
         self.__suspensions: Dict[str, str] = {}
+        self.__fins_suspension: Dict[str, datetime] = {}
+        # Incrémenté à chaque modification des emprunts
+        self._version = 0
+        # Écriture différée : modifications en attente et niveau d'imbrication de `lot()`
+        self._modifie = False
+        self._profondeur_lot = 0
         self.__charger()
 
     # ---------------- PERSISTANCE ----------------
@@ -81,10 +101,15 @@ class GestionEmprunt:
     def __nettoyer_suspensions(self):
         """Supprime les suspensions expirées."""
         now = datetime.now()
-        self.__suspensions = {
-            matricule: iso for matricule, iso in self.__suspensions.items()
-            if datetime.fromisoformat(iso) > now
-        }
+        expirees = [m for m, fin in self.__fins_suspension.items() if fin <= now]
+        for matricule in expirees:
+            del self.__suspensions[matricule]
+            del self.__fins_suspension[matricule]
+
+    def __suspendre(self, matricule: str, fin: datetime) -> None:
+        """Enregistre (ou remplace) la suspension de `matricule` jusqu'à `fin`."""
+        self.__suspensions[matricule] = fin.isoformat()
+        self.__fins_suspension[matricule] = fin
 
     def __charger(self):
         if not os.path.exists(DATA_FILE):
@@ -101,7 +126,7 @@ class GestionEmprunt:
         for d in data.get("emprunts", []):
             try:
                 emprunt = Emprunt.from_dict(d)
-                self.__emprunts[emprunt.id_emprunt] = emprunt
+                self.__enregistrer(emprunt)
             except Exception as ex:
                 id_emprunt = d.get('id_emprunt', 'inconnu')
                 print(f"Impossible de charger l'emprunt {id_emprunt}: {ex}")
@@ -109,26 +134,91 @@ class GestionEmprunt:
 
         # Chargement et nettoyage des suspensions
         raw_suspensions = data.get("suspensions", {}) or {}
-        self.__suspensions = {k: v for k, v in raw_suspensions.items() if isinstance(v, str)}
+        for matricule, iso in raw_suspensions.items():
+            if not isinstance(iso, str):
+                continue
+            try:
+                fin = datetime.fromisoformat(iso)
+            except ValueError:
+                enregistrer_action(
+                    acteur="SYSTEM",
+                    action="ERREUR_FORMAT_SUSPENSION",
+                    cible=matricule,
+                    details=f"Format de date invalide pour la suspension de l'utilisateur {matricule}",
+                    niveau="ERROR"
+                )
+                continue
+            self.__suspensions[matricule] = iso
+            self.__fins_suspension[matricule] = fin
         self.__nettoyer_suspensions()
 
     def recharger(self) -> None:
         """Relit le fichier des emprunts et remplace les données courantes."""
         self.__emprunts.clear()
+        self._par_user.clear()
+        self._en_cours.clear()
+        self._echeances.clear()
+        self._rangs.clear()
         self.__suspensions.clear()
+        self.__fins_suspension.clear()
+        self._version += 1
         self.__charger()
 
+    @property
+    def version(self) -> int:
+        """Compteur incrémenté à chaque modification des emprunts."""
+        return self._version
+
+    @contextmanager
+    def lot(self) -> Iterator["GestionEmprunt"]:
+        """Regroupe plusieurs modifications en une seule écriture du fichier.
+
+        Les sauvegardes demandées dans le bloc `with gestion.lot():` sont
+        différées jusqu'à la sortie du bloc le plus externe, y compris en
+        cas d'exception (les modifications déjà faites en mémoire sont
+        ainsi conservées). Le tampon du journal est vidé au même moment.
+        """
+        self._profondeur_lot += 1
+        try:
+            yield self
+        finally:
+            self._profondeur_lot -= 1
+            if self._profondeur_lot == 0:
+                if self._modifie:
+                    self.__ecrire()
+                vider_journal()
+
+    def __marquer_modifie(self):
+        """Compte une nouvelle version et note qu'une écriture est en attente."""
+        self._version += 1
+        self._modifie = True
+
     def __sauvegarder(self):
-        """Sauvegarde les emprunts et suspensions dans le fichier JSON."""
+        """Sauvegarde les emprunts et suspensions (différée à l'intérieur de `lot()`)."""
+        self.__marquer_modifie()
+        if self._profondeur_lot == 0:
+            self.__ecrire()
+
+    def __ecrire(self):
+        """Écrit les emprunts et suspensions dans le fichier JSON."""
+        self._modifie = False
         self.__nettoyer_suspensions()
-        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
+        # Un seul instant de référence pour le statut de tous les emprunts sauvegardés
+        now = datetime.now()
+        # Fichier temporaire puis remplacement atomique : jamais de fichier tronqué
+        temp_file = DATA_FILE + ".tmp"
         try:
-            with open(DATA_FILE, "w", encoding="utf-8") as f:
+            with open(temp_file, "w", encoding="utf-8") as f:
                 json.dump({
-                    "emprunts": [e.data_format() for e in self.__emprunts.values()],
+                    "emprunts": [e.data_format(now) for e in self.__emprunts.values()],
                     "suspensions": self.__suspensions
                 }, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, DATA_FILE)
         except Exception as e:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
             print(f"Erreur lors de la sauvegarde des emprunts: {e}")
             enregistrer_action(
                 acteur="SYSTEM",
@@ -140,49 +230,54 @@ class GestionEmprunt:
 
     # ---------------- OUTILS INTERNES ----------------
 
+    def __enregistrer(self, emprunt: Emprunt) -> None:
+        """Ajoute (ou remplace) un emprunt dans la table et dans les index."""
+        id_emprunt = emprunt.id_emprunt
+        ancien = self.__emprunts.get(id_emprunt)
+        if ancien is not None:
+            self._par_user.get(ancien.matricule_user, {}).pop(id_emprunt, None)
+        self.__emprunts[id_emprunt] = emprunt
+        self._rangs.setdefault(id_emprunt, len(self._rangs))
+        self._par_user.setdefault(emprunt.matricule_user, {})[id_emprunt] = emprunt
+        if emprunt.date_retour is None:
+            self._en_cours[id_emprunt] = emprunt
+            heapq.heappush(self._echeances, (emprunt.date_echeance, id_emprunt))
+        else:
+            self._en_cours.pop(id_emprunt, None)
+
+    def __compacter_echeances(self) -> None:
+        """Reconstruit le tas des échéances quand les entrées périmées y dominent.
+
+        Les emprunts retournés avant échéance (ou renouvelés) laissent une
+        entrée qui ne serait dépilée qu'à sa date : au-delà du double des
+        emprunts en cours, le tas est refait à partir de `_en_cours`.
+        """
+        if len(self._echeances) > 2 * len(self._en_cours) + 16:
+            self._echeances = [(e.date_echeance, i) for i, e in self._en_cours.items()]
+            heapq.heapify(self._echeances)
+
     def __is_suspended(self, matricule: str) -> Optional[str]:
-        """Vérifie si un utilisateur est suspendu. Nettoie automatiquement les suspensions expirées."""
-        iso = self.__suspensions.get(matricule)
-        if not iso:
-            return None
-        try:
-            end = datetime.fromisoformat(iso)
-        except ValueError:
-            # Date invalide : nettoyer
-            del self.__suspensions[matricule]
-            self.__sauvegarder()
-            enregistrer_action(
-                acteur="SYSTEM",
-                action="ERREUR_FORMAT_SUSPENSION",
-                cible=matricule,
-                details=f"Format de date invalide pour la suspension de l'utilisateur {matricule}",
-                niveau="ERROR"
-            )
-            return None
-        if datetime.now() < end:
-            return iso
-        # Suspension expirée : supprimer
-        del self.__suspensions[matricule]
-        self.__sauvegarder()
+        """Vérifie si un utilisateur est suspendu (lecture seule).
+
+        Les dates ont été validées au chargement ; les suspensions expirées
+        sont retirées par `__nettoyer_suspensions` lors de la sauvegarde.
+        """
+        end = self.__fins_suspension.get(matricule)
+        if end is not None and datetime.now() < end:
+            return self.__suspensions[matricule]
         return None
 
     def __trouver_exemplaire(self, livre: Livre, code_barre: Optional[str] = None) -> Optional[Exemplaire]:
         """Trouve un exemplaire disponible, soit par code-barres, soit le premier disponible."""
         if code_barre:
-            for ex in livre.exemplaires:
-                if ex.code_barre == code_barre:
-                    return ex
-            return None
-        for ex in livre.exemplaires:
-            if ex.statut == "disponible":
-                return ex
-        return None
+            return livre.get_exemplaire(code_barre)
+        return livre.prochain_exemplaire()
 
     # ---------------- ACTIONS PRINCIPALES ----------------
 
     def emprunter(self, matricule: str, isbn: str, code_barre: Optional[str] = None, duree_jours: int = 14) -> Emprunt:
         """Enregistre un nouvel emprunt."""
-        user = self._gestion_user.get_utilisateur_par_matricule(matricule)
+        user = self._services.user.get_utilisateur_par_matricule(matricule)
         if not user:
             raise ValueError("Utilisateur introuvable")
         if self.__is_suspended(matricule):
@@ -190,12 +285,12 @@ class GestionEmprunt:
         if not user.peut_emprunter():
             raise LimiteAtteinte("Limite d'emprunts atteinte ou statut invalide")
 
-        livre = self._gestion_livre.get_livre(isbn)
+        livre = self._services.livre.get_livre(isbn)
         if not livre:
             raise ValueError("Livre introuvable")
 
         exemplaire = self.__trouver_exemplaire(livre, code_barre)
-        if not exemplaire or exemplaire.statut != "disponible":
+        if not exemplaire or exemplaire.statut_enum is not StatutLivre.DISPONIBLE:
             raise ExemplaireIndisponible("Aucun exemplaire disponible")
 
         now = datetime.now()
@@ -208,13 +303,13 @@ class GestionEmprunt:
         )
 
         # Mise à jour des objets métier
-        exemplaire.statut = "emprunte"
+        exemplaire.statut = StatutLivre.EMPRUNTE
         livre.incrementer_compteur()
         livre.mettre_a_jour_statut()
         user.enregistrer_emprunt(isbn, exemplaire.code_barre)
 
         # Enregistrement dans le gestionnaire
-        self.__emprunts[emprunt.id_emprunt] = emprunt
+        self.__enregistrer(emprunt)
         self.__sauvegarder()
 
         enregistrer_action(
@@ -234,20 +329,21 @@ class GestionEmprunt:
             return emprunt
 
         emprunt.retourner()
+        self._en_cours.pop(id_emprunt, None)
+        self.__compacter_echeances()
 
         # Mise à jour de l'exemplaire
-        livre = self._gestion_livre.get_livre(emprunt.isbn)
+        livre = self._services.livre.get_livre(emprunt.isbn)
         if livre:
-            for ex in livre.exemplaires:
-                if ex.code_barre == emprunt.code_barre:
-                    ex.statut = StatutLivre.DISPONIBLE
-                    break
+            ex = livre.get_exemplaire(emprunt.code_barre)
+            if ex is not None:
+                ex.statut = StatutLivre.DISPONIBLE
             livre.mettre_a_jour_statut()
         else:
             print(f"Avertissement : livre non trouvé lors du retour (ISBN: {emprunt.isbn})")
 
         # Mise à jour de l'utilisateur
-        user = self._gestion_user.get_utilisateur_par_matricule(emprunt.matricule_user)
+        user = self._services.user.get_utilisateur_par_matricule(emprunt.matricule_user)
         if user:
             user.enregistrer_retour(emprunt.isbn, emprunt.code_barre)
         else:
@@ -262,10 +358,10 @@ class GestionEmprunt:
             jours_suspension = jours_retard * self.FACTEUR_SUSPENSION
 
             suspend_until = datetime.now() + timedelta(days=jours_suspension)
-            self.__suspensions[emprunt.matricule_user] = suspend_until.isoformat()
+            self.__suspendre(emprunt.matricule_user, suspend_until)
         
-        if self._gestion_reservation: # Notification dans la file d'attente 
-            self._gestion_reservation.traiter_file(emprunt.isbn)
+        if self._services.reservation: # Notification dans la file d'attente 
+            self._services.reservation.traiter_file(emprunt.isbn)
 
         self.__sauvegarder()
 
@@ -278,14 +374,10 @@ class GestionEmprunt:
         emprunt = self.__emprunts.get(id_emprunt)
         if not emprunt:
             raise EmpruntNonTrouve("Emprunt non trouvé")
-            enregistrer_action(
-                acteur="SYSTEM",
-                action="ERREUR_RENOUVELLEMENT",
-                cible=id_emprunt,
-                details="Erreur lors du renouvellement de l'emprunt"
-            )
         result = emprunt.renouveler(jours)
         if result:
+            heapq.heappush(self._echeances, (emprunt.date_echeance, id_emprunt))
+            self.__compacter_echeances()
             self.__sauvegarder()
         return result
 
@@ -295,38 +387,65 @@ class GestionEmprunt:
         return self.__emprunts.get(id_emprunt)
 
     def lister_par_user(self, matricule: str) -> List[Emprunt]:
-        return [e for e in self.__emprunts.values() if e.matricule_user == matricule]
+        return list(self._par_user.get(matricule, {}).values())
     
     def lister_emprunts_en_cours_par_user(self, matricule: str) -> List[Emprunt]:
         return [
-            e for e in self.__emprunts.values()
-            if e.matricule_user == matricule and e.date_retour is None
+            e for e in self._par_user.get(matricule, {}).values()
+            if e.date_retour is None
         ]
 
     def lister_en_cours(self) -> List[Emprunt]:
-        return [e for e in self.__emprunts.values() if not e.date_retour]
+        return list(self._en_cours.values())
 
     def lister_en_retard(self) -> List[Emprunt]:
         now = datetime.now()
-        return [e for e in self.lister_en_cours() if e.date_echeance < now]
+        # Seuls les emprunts non retournés sont parcourus
+        return [e for e in self._en_cours.values() if e.date_echeance < now]
 
     def appliquer_penalites(self) -> None:
         """Parcourt les emprunts en cours et applique des suspensions.
 
         Pour chaque emprunt en retard, calcule la durée de suspension
         en multipliant les jours de retard par `FACTEUR_SUSPENSION` et
-        enregistre la suspension dans la table interne.
+        enregistre la suspension dans la table interne. Si un utilisateur a
+        plusieurs emprunts en retard, c'est le dernier dans l'ordre
+        d'enregistrement des emprunts qui fixe sa suspension.
+
+        Seuls les emprunts échus sont dépilés du tas des échéances ; les
+        entrées périmées (emprunt retourné ou renouvelé) sont abandonnées,
+        et les emprunts toujours en cours y sont remis pour le prochain passage.
         """
         now = datetime.now()
-        for emprunt in self.lister_en_cours():
-            if emprunt.date_echeance < now:
-                jours_retard = (now - emprunt.date_echeance).days
-                if jours_retard > 0:
-                    jours_suspension = jours_retard * self.FACTEUR_SUSPENSION
-                    suspend_until = now + timedelta(days=jours_suspension)
-                    self.__suspensions[emprunt.matricule_user] = suspend_until.isoformat()
-
-        self.__sauvegarder()
+        echeances = self._echeances
+        en_retard: List[Tuple[datetime, str]] = []
+        while echeances and echeances[0][0] < now:
+            entree = heapq.heappop(echeances)
+            echeance, id_emprunt = entree
+            emprunt = self._en_cours.get(id_emprunt)
+            # Entrée périmée (emprunt retourné ou renouvelé) ou doublon : abandonnée
+            if emprunt is None or emprunt.date_echeance != echeance:
+                continue
+            if en_retard and en_retard[-1] == entree:
+                continue
+            en_retard.append(entree)
+
+        # Ordre d'enregistrement des emprunts, comme un parcours de la liste des emprunts en cours
+        rangs = self._rangs
+        en_retard.sort(key=lambda entree: rangs[entree[1]])
+        suspensions_appliquees = 0
+        for echeance, id_emprunt in en_retard:
+            jours_retard = (now - echeance).days
+            if jours_retard > 0:
+                jours_suspension = jours_retard * self.FACTEUR_SUSPENSION
+                suspend_until = now + timedelta(days=jours_suspension)
+                self.__suspendre(self._en_cours[id_emprunt].matricule_user, suspend_until)
+                suspensions_appliquees += 1
+            heapq.heappush(echeances, (echeance, id_emprunt))
+
+        # Aucun retard d'au moins un jour : rien à réécrire
+        if suspensions_appliquees:
+            self.__sauvegarder()
 
         enregistrer_action(
             acteur="SYSTEM",
@@ -5,12 +5,14 @@ des livres (dans `data/livres.json`), la recherche, l'ajout/suppression
 et la gestion des exemplaires physiques.
 """
 
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional
 from models.livre import Livre
 from models.exemplaire import Exemplaire
 from models.enums import CategorieLivre, StatutLivre
 from utils import clean
 from services.journal import enregistrer_action
+from services.registre import Services
 
 
 import json
@@ -20,6 +22,25 @@ import os
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 DATA_FILE = os.path.join(DATA_DIR, 'livres.json')
+# Le dossier de données est créé une fois, au chargement du module
+os.makedirs(DATA_DIR, exist_ok=True)
+
+
+@lru_cache(maxsize=None)
+def _resoudre_categorie(cat: str) -> CategorieLivre:
+    """Catégorie correspondant à `cat` (nom puis valeur de l'enum, AUTRE à défaut).
+
+    Les catégories distinctes sont peu nombreuses : chaque chaîne n'est
+    résolue (et ses exceptions levées) qu'une seule fois par session.
+    """
+    try:
+        return CategorieLivre[cat]
+    except KeyError:
+        # essayer par valeur
+        try:
+            return CategorieLivre(cat)
+        except ValueError:
+            return CategorieLivre.AUTRE
 
 
 class GestionLivre:
@@ -30,9 +51,18 @@ class GestionLivre:
     - gestion des exemplaires
     """
 
-    def __init__(self, gestion_reservation=None):
+    def __init__(self, services: Optional[Services] = None):
         self._livres: List[Livre] = []
-        self._gestion_reservation = gestion_reservation
+        # Index {isbn: livre} tenu à jour au chargement, à l'ajout et à la suppression
+        self._par_isbn: Dict[str, Livre] = {}
+        # Index {code-barres normalisé: livre} couvrant tous les exemplaires du catalogue
+        self._par_code_barre: Dict[str, Livre] = {}
+        # Incrémenté à chaque modification du catalogue
+        self._version = 0
+        # (version du catalogue, révision des ISBN) lors de la dernière reconstruction de l'index
+        self._etat_index = (0, Livre.revision_isbn)
+        # Registre partagé pour accéder à la gestion des réservations
+        self._services = services or Services()
         # charger les données existantes si présent
         self.__charger()
 
@@ -54,40 +84,29 @@ class GestionLivre:
         for d in data:
             try:
                 cat = d.get('categorie')
-                if cat:
-                    try:
-                        categorie = CategorieLivre[cat]
-                    except Exception:
-                        # essayer par valeur
-                        try:
-                            categorie = CategorieLivre(cat)
-                        except Exception:
-                            categorie = CategorieLivre.AUTRE
+                if cat and isinstance(cat, str):
+                    categorie = _resoudre_categorie(cat)
                 else:
                     categorie = CategorieLivre.AUTRE
 
-                livre = Livre(
-                    isbn=d.get('isbn'),
-                    titre=d.get('titre'),
-                    auteur=d.get('auteur'),
-                    editeur=d.get('editeur'),
-                    annee_publication=int(d.get('annee_publication', 0) or 0),
-                    categorie=categorie,
-                    mots_cles=d.get('mots_cles', [])
-                )
+                # Données écrites par sauvegarder() : reconstruction sans revalidation
+                livre = Livre.from_dict(d, categorie)
 
                 # ajouter exemplaires si présents
                 for ex in d.get('exemplaires', []) or []:
                     code = ex.get('code_barre')
                     if code:
                         try:
-                            exemplaire = Exemplaire(code_barre=code, etat=ex.get('etat', 'bon'), localisation=ex.get('localisation', 'stock'), statut=ex.get('statut', 'disponible'))
+                            exemplaire = Exemplaire.from_dict(ex)
                             livre.ajouter_exemplaire(exemplaire)
+                            self._par_code_barre.setdefault(code.strip().lower(), livre)
                         except Exception:
                             # ignorer exemplaire invalide
                             pass
 
                 self._livres.append(livre)
+                # En cas de doublon dans le fichier, le premier livre l'emporte
+                self._par_isbn.setdefault(livre.isbn, livre)
             except Exception:
                 # ignorer en cas d'erreur de lecture d'un élément
                 pass
@@ -95,7 +114,11 @@ class GestionLivre:
     def recharger(self) -> None:
         """Relit le fichier JSON et remplace la liste courante de livres."""
         self._livres = []
+        self._par_isbn.clear()
+        self._par_code_barre.clear()
+        self._version += 1
         self.__charger()
+        self._etat_index = (self._version, Livre.revision_isbn)
 
     # ==========================
     #   LIVRES
@@ -103,7 +126,7 @@ class GestionLivre:
 
     def isbn_existe(self, isbn: str) -> bool:
         """Vérifie si un ISBN existe déjà"""
-        return any(livre.isbn == isbn for livre in self._livres)
+        return self.get_livre(isbn) is not None
 
     def ajouter_livre(self, livre: Livre) -> None:
         """Ajoute un livre au catalogue après vérification d'unicité ISBN.
@@ -114,6 +137,7 @@ class GestionLivre:
             raise ValueError("ISBN déjà existant dans la bibliothèque")
 
         self._livres.append(livre)
+        self._par_isbn[livre.isbn] = livre
         self.sauvegarder()
 
         enregistrer_action(
@@ -129,10 +153,20 @@ class GestionLivre:
 
         Retourne `True` si la suppression a été effectuée, `False` sinon.
         """
-        for i, livre in enumerate(self._livres):
-            if livre.isbn == isbn:
-                del self._livres[i]
-                return True
+        livre = self.get_livre(isbn)
+        if livre is not None:
+            self._livres.remove(livre)
+            del self._par_isbn[isbn]
+            for ex in livre.iter_exemplaires():
+                cle = ex.code_barre.strip().lower()
+                if self._par_code_barre.get(cle) is livre:
+                    del self._par_code_barre[cle]
+            # Un éventuel doublon chargé depuis le fichier prend la place dans l'index
+            suivant = next((l for l in self._livres if l.isbn == isbn), None)
+            if suivant is not None:
+                self._par_isbn[isbn] = suivant
+            self._version += 1
+            return True
             
         enregistrer_action(
             acteur="Admin",
@@ -143,26 +177,66 @@ class GestionLivre:
         return False
 
     def get_livre(self, isbn: str) -> Optional[Livre]:
-        """Retourne un livre par ISBN"""
-        for livre in self._livres:
-            if livre.isbn == isbn:
-                return livre
-        return None
+        """Retourne un livre par ISBN (recherche dans l'index)"""
+        livre = self._par_isbn.get(isbn)
+        # L'ISBN d'un livre est modifiable : si l'entrée ne correspond plus,
+        # ou si un ISBN absent a pu apparaître depuis la dernière reconstruction,
+        # on reconstruit l'index
+        if (livre is None and self._index_perime()) or (livre is not None and livre.isbn != isbn):
+            self._reindexer()
+            livre = self._par_isbn.get(isbn)
+        return livre
+
+    def _index_perime(self) -> bool:
+        """Indique si le catalogue ou un ISBN a changé depuis la dernière reconstruction."""
+        return self._etat_index != (self._version, Livre.revision_isbn)
+
+    def _reindexer(self) -> None:
+        """Reconstruit l'index par ISBN à partir de la liste des livres."""
+        self._par_isbn = {livre.isbn: livre for livre in reversed(self._livres)}
+        self._etat_index = (self._version, Livre.revision_isbn)
 
     def lister_livres(self) -> List[Livre]:
         """Retourne tous les livres"""
         return self._livres
+
+    def livres_par_isbn(self) -> Dict[str, Livre]:
+        """Retourne l'index {isbn: livre} (le premier livre l'emporte, comme `get_livre`).
+
+        L'index est partagé : il est à consulter en lecture seule.
+        """
+        if self._index_perime():
+            self._reindexer()
+        return self._par_isbn
     
-    def sauvegarder(self) -> None:
-        os.makedirs(DATA_DIR, exist_ok=True)
+    @property
+    def version(self) -> int:
+        """Compteur incrémenté à chaque modification du catalogue."""
+        return self._version
 
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(
-                [livre.data_format() for livre in self._livres],
-                f,
-                indent=4,
-                ensure_ascii=False
-            )
+    def sauvegarder(self) -> None:
+        """Persiste le catalogue : écriture dans un fichier temporaire puis
+        remplacement atomique, pour ne jamais laisser un fichier tronqué."""
+        # Toute modification est suivie d'une sauvegarde : on compte une nouvelle version
+        self._version += 1
+        # Un ISBN a pu être modifié directement sur l'objet Livre : l'index est rafraîchi
+        self._reindexer()
+        temp_file = DATA_FILE + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    [livre.data_format() for livre in self._livres],
+                    f,
+                    indent=4,
+                    ensure_ascii=False
+                )
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, DATA_FILE)
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
 
 
     # ==========================
@@ -176,14 +250,7 @@ class GestionLivre:
         if not code_barre or not isinstance(code_barre, str):
             return False
 
-        code = code_barre.strip().lower()
-
-        for livre in self._livres:
-            for ex in livre.exemplaires:
-                if ex.code_barre.strip().lower() == code:
-                    return True
-
-        return False
+        return code_barre.strip().lower() in self._par_code_barre
 
 
     def ajouter_exemplaire(self, isbn: str, exemplaire: Exemplaire) -> None:
@@ -200,11 +267,12 @@ class GestionLivre:
             raise ValueError("Code-barres déjà utilisé dans le système")
 
         livre.ajouter_exemplaire(exemplaire)
+        self._par_code_barre[exemplaire.code_barre.strip().lower()] = livre
         self.sauvegarder()
 
         # Notifier les réservations si besoin
-        if self._gestion_reservation:
-            self._gestion_reservation.traiter_file(isbn)
+        if self._services.reservation:
+            self._services.reservation.traiter_file(isbn)
         
         enregistrer_action(
             acteur="Admin",
@@ -226,14 +294,20 @@ class GestionLivre:
             details=f"Retrait de l'exemplaire {code_barre} du livre {livre.titre} (ISBN: {isbn})"
         )
 
-        return livre.retirer_exemplaire(code_barre)
+        self._version += 1
+        retire = livre.retirer_exemplaire(code_barre)
+        if retire:
+            cle = code_barre.strip().lower()
+            if self._par_code_barre.get(cle) is livre:
+                del self._par_code_barre[cle]
+        return retire
     
     def nombre_exemplaires(self, isbn: str) -> int:
         """Retourne le nombre d'exemplaires pour un livre"""
         livre = self.get_livre(isbn)
         if livre is None:
             return 0
-        return len(livre.exemplaires)
+        return livre.nombre_exemplaires
     
     def afficher_exemplaires(self, insb: str) -> list:
         """Retourne la liste des exemplaires pour un livre"""
@@ -274,60 +348,51 @@ class GestionLivre:
         if all(v is None for v in [isbn, titre, auteur, editeur, categorie, annee, statut, mot_cle]):
             return list(self._livres.values()) if isinstance(self._livres, dict) else self._livres
 
-        resultats = set()
+        # Critères normalisés une seule fois, pas à chaque livre
+        isbn_nettoye = isbn.replace("-", "").lower() if isbn is not None else None
+        titre_min = titre.lower() if titre is not None else None
+        auteur_min = auteur.lower() if auteur is not None else None
+        editeur_min = editeur.lower() if editeur is not None else None
+        texte_demande = titre is not None or auteur is not None or editeur is not None
+
+        # Chaque livre n'est visité qu'une fois : une liste suffit et garde l'ordre du catalogue
+        resultats: List[Livre] = []
 
         for livre in (self._livres.values() if isinstance(self._livres, dict) else self._livres):
-            match = False
+            # Critères exacts (simples comparaisons) avant les recherches de sous-chaînes
+            if categorie is not None and livre.categorie == categorie:
+                resultats.append(livre)
+                continue
+
+            if annee is not None and livre.annee_publication == annee:
+                resultats.append(livre)
+                continue
+
+            if statut is not None and livre.statut == statut:
+                resultats.append(livre)
+                continue
 
             # ISBN (normalisé)
-            if isbn is not None:
-                isbn_nettoye = isbn.replace("-", "").lower()
-                if livre.isbn.replace("-", "").lower() == isbn_nettoye:
-                    match = True
-
-            # Titre
-            if not match and titre is not None:
-                if titre.lower() in livre.titre.lower():
-                    match = True
-
-            # Auteur
-            if not match and auteur is not None:
-                if auteur.lower() in livre.auteur.lower():
-                    match = True
-
-            # Éditeur
-            if not match and editeur is not None:
-                if editeur.lower() in livre.editeur.lower():
-                    match = True
-
-            # Catégorie
-            if not match and categorie is not None:
-                if livre.categorie == categorie:
-                    match = True
-
-            # Année
-            if not match and annee is not None:
-                if livre.annee_publication == annee:
-                    match = True
-
-            # Statut
-            if not match and statut is not None:
-                if livre.statut == statut:
-                    match = True
+            if isbn_nettoye is not None and livre.isbn.replace("-", "").lower() == isbn_nettoye:
+                resultats.append(livre)
+                continue
+
+            if texte_demande:
+                # Titre, auteur, éditeur déjà en minuscules (mémorisés par le livre)
+                titre_livre, auteur_livre, editeur_livre = livre.champs_recherche()
+                if (
+                    (titre_min is not None and titre_min in titre_livre)
+                    or (auteur_min is not None and auteur_min in auteur_livre)
+                    or (editeur_min is not None and editeur_min in editeur_livre)
+                ):
+                    resultats.append(livre)
+                    continue
 
             # Mot-clé (recherche globale)
-            if not match and mot_cle is not None:
-                mot = mot_cle.lower()
-                if (mot in livre.titre.lower() or
-                    mot in livre.auteur.lower() or
-                    mot in livre.editeur.lower() or
-                    any(mot in mc.lower() for mc in livre.mots_cles)):
-                    match = True
-
-            if match:
-                resultats.add(livre)
-
-        return list(resultats)
+            if mot_cle is not None and livre.rechercher(mot_cle):
+                resultats.append(livre)
+
+        return resultats
 
     # ==========================
     #   STATISTIQUES SIMPLES
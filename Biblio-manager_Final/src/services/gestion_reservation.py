@@ -5,41 +5,69 @@ confirmation des réservations. Il persiste les réservations et les
 files d'attente dans `data/reservations.json` et écrit des
 notifications dans `data/notifications.txt`.
 
-Le service dépend optionnellement des gestionnaires suivants :
-- `gestion_livre` : pour vérifier la disponibilité des livres
-- `gestion_emprunt` : pour créer l'emprunt lors de la confirmation
-- `gestion_user` : pour valider l'existence des utilisateurs
+Chaque modification est ajoutée en une ligne JSON à
+`data/reservations.log` ; le fichier complet n'est réécrit (et le
+journal vidé) que tous les `SEUIL_COMPACTION` ajouts. Au chargement,
+le journal est rejoué par-dessus le fichier complet.
+
+Le service dépend optionnellement des gestionnaires suivants, retrouvés
+dans le registre `Services` partagé :
+- `livre` : pour vérifier la disponibilité des livres
+- `emprunt` : pour créer l'emprunt lors de la confirmation
+- `user` : pour valider l'existence des utilisateurs
 """
 
+import atexit
 import os
 import json
-from typing import Dict, List, Optional
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, TextIO
 from datetime import datetime
 
 from models.reservation import Reservation
 from services.journal import enregistrer_action
+from services.registre import Services
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 DATA_FILE = os.path.join(DATA_DIR, 'reservations.json')
 NOTIF_FILE = os.path.join(DATA_DIR, 'notifications.txt')
+JOURNAL_FILE = os.path.join(DATA_DIR, 'reservations.log')
+# Le dossier de données est créé une fois, au chargement du module
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Nombre de lignes de journal au-delà duquel le fichier complet est réécrit
+SEUIL_COMPACTION = 500
 
 
 class GestionReservation:
     """Service pour gérer les réservations et files d'attente."""
 
-    def __init__(self, gestion_livre=None, gestion_emprunt=None, gestion_user=None):
+    def __init__(self, services: Optional[Services] = None):
         """Initialise le gestionnaire de réservations.
 
         Charge les réservations persistées et prépare les structures en
-        mémoire pour les opérations ultérieures.
+        mémoire pour les opérations ultérieures. Les autres gestionnaires
+        sont lus dans le registre `services` au moment de leur utilisation.
         """
-        self._gestion_livre = gestion_livre
-        self._gestion_emprunt = gestion_emprunt
-        self._gestion_user = gestion_user
+        self._services = services or Services()
         self._reservations: Dict[str, Reservation] = {}
-        self._files: Dict[str, List[str]] = {}
+        # Files d'attente par ISBN. Un retrait ne touche que l'ensemble des membres :
+        # l'ID reste dans la deque (entrée périmée) jusqu'à ce qu'il en atteigne la tête
+        self._files: Dict[str, Deque[str]] = {}
+        self._membres_file: Dict[str, Set[str]] = {}
+        # Réservations par matricule (dict pour garder l'ordre de création)
+        self._par_user: Dict[str, Dict[str, Reservation]] = {}
+        # Lignes écrites dans JOURNAL_FILE depuis la dernière réécriture complète
+        self._taille_journal = 0
+        # Réservations modifiées dans un `lot()` en cours, écrites à sa sortie
+        self._profondeur_lot = 0
+        self._en_attente: Dict[str, Reservation] = {}
+        # Fichier des notifications, ouvert à la première notification et gardé ouvert
+        self._fichier_notifications: Optional[TextIO] = None
         self.__charger()
+        self.__rejouer_journal()
 
     def __charger(self) -> None:
         if not os.path.exists(DATA_FILE):
@@ -51,35 +79,152 @@ class GestionReservation:
             print(f"Erreur de chargement de {DATA_FILE}: {e}")
             return
 
+        # Références locales : boucle exécutée pour chaque réservation persistée
+        from_dict = Reservation.from_dict
+        indexer = self._indexer
         for d in data.get('reservations', []):
             try:
-                r = Reservation.from_dict(d)
-                self._reservations[r.id] = r
+                indexer(from_dict(d))
             except Exception as e:
                 print(f"Impossible de charger la réservation: {e}")
                 continue
 
-        self._files = data.get('files', {}) or {}
+        for isbn, ids in (data.get('files', {}) or {}).items():
+            self._definir_file(isbn, ids)
+
+    def __rejouer_journal(self) -> None:
+        """Applique les modifications journalisées depuis la dernière sauvegarde complète."""
+        if not os.path.exists(JOURNAL_FILE):
+            return
+        from_dict = Reservation.from_dict
+        invalide = False
+        with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
+            for ligne in f:
+                self._taille_journal += 1
+                try:
+                    op = json.loads(ligne)
+                    if op['op'] == 'reservation':
+                        self._indexer(from_dict(op['data']))
+                    elif op['op'] == 'file':
+                        self._definir_file(op['isbn'], op['ids'])
+                except (ValueError, KeyError, TypeError) as e:
+                    # Ligne incomplète (arrêt pendant l'écriture) ou invalide : ignorée
+                    print(f"Entrée de journal des réservations ignorée: {e}")
+                    invalide = True
+        # Repartir d'un journal vide : un ajout ne doit pas prolonger une ligne tronquée
+        if invalide:
+            self.sauvegarder()
+
+    def _indexer(self, reservation: Reservation) -> None:
+        """Ajoute (ou remplace) une réservation dans la table et l'index par utilisateur."""
+        self._reservations[reservation.id] = reservation
+        self._par_user.setdefault(reservation.matricule_user, {})[reservation.id] = reservation
+
+    @contextmanager
+    def lot(self) -> Iterator["GestionReservation"]:
+        """Regroupe plusieurs modifications en une seule écriture du journal.
+
+        Comme `GestionEmprunt.lot`, les écritures demandées dans le bloc
+        `with gestion.lot():` sont différées jusqu'à la sortie du bloc le
+        plus externe, y compris en cas d'exception. Une réservation modifiée
+        plusieurs fois n'est alors écrite qu'une fois.
+        """
+        self._profondeur_lot += 1
+        try:
+            yield self
+        finally:
+            self._profondeur_lot -= 1
+            if self._profondeur_lot == 0 and self._en_attente:
+                reservations = list(self._en_attente.values())
+                self._en_attente.clear()
+                self._ecrire_modifications(reservations)
+
+    def _enregistrer_modification(self, reservation: Reservation) -> None:
+        """Persiste la réservation modifiée et la file de son ISBN.
+
+        À l'intérieur d'un `lot()`, l'écriture est différée à la sortie du bloc.
+        """
+        if self._profondeur_lot:
+            self._en_attente[reservation.id] = reservation
+            return
+        self._ecrire_modifications((reservation,))
+
+    def _ecrire_modifications(self, reservations: Iterable[Reservation]) -> None:
+        """Ajoute au journal les réservations données et les files de leurs ISBN.
+
+        Les lignes sont ajoutées au journal en une seule écriture au lieu de
+        réécrire tout le fichier ; au-delà de `SEUIL_COMPACTION` lignes,
+        `sauvegarder` réécrit le fichier complet et vide le journal.
+        """
+        if self._taille_journal >= SEUIL_COMPACTION:
+            self.sauvegarder()
+            return
+        lignes = []
+        isbns: Dict[str, None] = {}
+        for reservation in reservations:
+            lignes.append(json.dumps({'op': 'reservation', 'data': reservation.data_format()}, ensure_ascii=False))
+            isbns[reservation.isbn] = None
+        for isbn in isbns:
+            lignes.append(json.dumps({'op': 'file', 'isbn': isbn, 'ids': self._ids_file(isbn)}, ensure_ascii=False))
+        try:
+            with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lignes) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._taille_journal += len(lignes)
+        except Exception as e:
+            print(f"Erreur de sauvegarde: {e}")
 
     def sauvegarder(self) -> None:
-        os.makedirs(DATA_DIR, exist_ok=True)
+        """Réécrit le fichier complet des réservations puis vide le journal."""
         data = {
             'reservations': [r.data_format() for r in self._reservations.values()],
-            'files': self._files,
+            'files': {isbn: self._ids_file(isbn) for isbn in self._files},
         }
+        # Fichier temporaire puis remplacement atomique : jamais de fichier tronqué
+        temp_file = DATA_FILE + '.tmp'
         try:
-            with open(DATA_FILE, 'w', encoding='utf-8') as f:
+            with open(temp_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, DATA_FILE)
         except Exception as e:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
             print(f"Erreur de sauvegarde: {e}")
+            return
+        # Tout est dans le fichier complet : le journal repart de zéro
+        if os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+        self._taille_journal = 0
 
     def recharger(self) -> None:
         self._reservations.clear()
         self._files.clear()
+        self._membres_file.clear()
+        self._par_user.clear()
+        self._en_attente.clear()
+        self._taille_journal = 0
         self.__charger()
+        self.__rejouer_journal()
+
+    def _definir_file(self, isbn: str, ids: Iterable[str]) -> None:
+        """Remplace la file de `isbn` par les IDs donnés (dans l'ordre)."""
+        file = deque(ids)
+        self._files[isbn] = file
+        self._membres_file[isbn] = set(file)
+
+    def _ids_file(self, isbn: str) -> List[str]:
+        """IDs encore présents dans la file de `isbn`, sans les entrées périmées."""
+        membres = self._membres_file.get(isbn, ())
+        return [i for i in self._files.get(isbn, ()) if i in membres]
 
     def _ajouter_a_file(self, isbn: str, id_reservation: str) -> None:
-        self._files.setdefault(isbn, []).append(id_reservation)
+        if isbn not in self._files:
+            self._definir_file(isbn, ())
+        self._files[isbn].append(id_reservation)
+        self._membres_file[isbn].add(id_reservation)
         enregistrer_action(
             acteur="SYSTEM",
             action="AJOUT_FILE_RESERVATION",
@@ -88,13 +233,39 @@ class GestionReservation:
         )
 
     def _retirer_de_file(self, isbn: str, id_reservation: str) -> None:
-        if isbn in self._files and id_reservation in self._files[isbn]:
-            self._files[isbn].remove(id_reservation)
+        membres = self._membres_file.get(isbn)
+        if membres is None or id_reservation not in membres:
+            return
+        membres.discard(id_reservation)
+        file = self._files[isbn]
+        while file and file[0] not in membres:
+            file.popleft()
+        # Trop d'entrées périmées au milieu de la file : on la reconstruit
+        if len(file) > 2 * len(membres) + 8:
+            self._definir_file(isbn, self._ids_file(isbn))
 
     def _ecrire_notification(self, message: str) -> None:
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(NOTIF_FILE, 'a', encoding='utf-8') as f:
-            f.write(f"[{datetime.now().isoformat()}] {message}\n")
+        """Ajoute une notification au fichier, gardé ouvert entre deux appels."""
+        f = self._fichier_notifications
+        if f is None:
+            # Tampon par ligne : chaque notification est écrite aussitôt sur le disque
+            f = open(NOTIF_FILE, 'a', encoding='utf-8', buffering=1)
+            self._fichier_notifications = f
+            atexit.register(self.fermer_notifications)
+        f.write(f"[{datetime.now().isoformat()}] {message}\n")
+
+    def vider_notifications(self) -> None:
+        """Force l'écriture des notifications en attente dans le fichier."""
+        if self._fichier_notifications is not None:
+            self._fichier_notifications.flush()
+
+    def fermer_notifications(self) -> None:
+        """Ferme le fichier des notifications."""
+        f = self._fichier_notifications
+        if f is not None:
+            self._fichier_notifications = None
+            atexit.unregister(self.fermer_notifications)
+            f.close()
 
     def reserver(self, matricule_user: str, isbn: str) -> Reservation:
         """Crée une réservation pour l'utilisateur sur l'ISBN donné.
@@ -104,14 +275,14 @@ class GestionReservation:
         disponible) et absence de double-réservation par le même utilisateur.
         """
         # Vérification utilisateur
-        if self._gestion_user:
-            user = self._gestion_user.get_utilisateur_par_matricule(matricule_user)
+        if self._services.user:
+            user = self._services.user.get_utilisateur_par_matricule(matricule_user)
             if not user:
                 raise ValueError("Utilisateur introuvable")
 
         # Vérification livre
-        if self._gestion_livre:
-            livre = self._gestion_livre.get_livre(isbn)
+        if self._services.livre:
+            livre = self._services.livre.get_livre(isbn)
             if not livre:
                 raise ValueError("Livre introuvable")
             if livre.est_disponible():
@@ -123,9 +294,9 @@ class GestionReservation:
                 raise ValueError("Vous avez déjà une réservation en cours pour ce livre")
 
         r = Reservation(matricule_user=matricule_user, isbn=isbn)
-        self._reservations[r.id] = r
+        self._indexer(r)
         self._ajouter_a_file(isbn, r.id)
-        self.sauvegarder()
+        self._enregistrer_modification(r)
 
         enregistrer_action(
             acteur=matricule_user, 
@@ -145,7 +316,7 @@ class GestionReservation:
             return False
         r.annuler()
         self._retirer_de_file(r.isbn, id_reservation)
-        self.sauvegarder()
+        self._enregistrer_modification(r)
 
         enregistrer_action(
             acteur=r.matricule_user,
@@ -167,25 +338,30 @@ class GestionReservation:
         Retourne l'ID de la réservation notifiée, ou `None` si aucune
         notification n'a été envoyée.
         """
-        if not self._gestion_livre:
+        if not self._services.livre:
             return None
 
-        livre = self._gestion_livre.get_livre(isbn)
+        livre = self._services.livre.get_livre(isbn)
         if not livre or not livre.est_disponible():
             return None
 
-        # Nettoyer la file
-        file_propre = []
-        for rid in self._files.get(isbn, []):
+        # Nettoyer la tête de la file : entrées périmées et réservations qui ne sont plus en attente
+        if isbn not in self._files:
+            self._definir_file(isbn, ())
+        file = self._files[isbn]
+        membres = self._membres_file[isbn]
+        while file:
+            rid = file[0]
             r = self._reservations.get(rid)
-            if r and r.statut == Reservation.STATUT_EN_ATTENTE:
-                file_propre.append(rid)
-        self._files[isbn] = file_propre
+            if rid in membres and r and r.statut == Reservation.STATUT_EN_ATTENTE:
+                break
+            file.popleft()
+            membres.discard(rid)
 
-        if not file_propre:
+        if not file:
             return None
 
-        first_id = file_propre[0]
+        first_id = file[0]
         r = self._reservations.get(first_id)
         if not r:
             return None
@@ -195,7 +371,7 @@ class GestionReservation:
             message = f"L'utilisateur {r.matricule_user} peut emprunter le livre {r.isbn} (réservation {r.id})."
             print("Notification :", message)
             self._ecrire_notification(message)
-            self.sauvegarder()
+            self._enregistrer_modification(r)
 
             enregistrer_action(
                 acteur="SYSTEM",
@@ -211,7 +387,7 @@ class GestionReservation:
     def confirmer(self, id_reservation: str) -> bool:
         """Confirme une réservation et crée un emprunt si possible.
 
-        Si `gestion_emprunt` est disponible, un emprunt est créé pour
+        Si la gestion des emprunts est disponible, un emprunt est créé pour
         l'utilisateur. La réservation est alors marquée confirmée et
         retirée de la file.
         """
@@ -219,12 +395,12 @@ class GestionReservation:
         if not r or not r.est_confirmable():
             return False
 
-        if self._gestion_emprunt:
+        if self._services.emprunt:
             try:
-                emprunt = self._gestion_emprunt.emprunter(r.matricule_user, r.isbn)
+                emprunt = self._services.emprunt.emprunter(r.matricule_user, r.isbn)
                 r.confirmer()
                 self._retirer_de_file(r.isbn, id_reservation)
-                self.sauvegarder()
+                self._enregistrer_modification(r)
                 print(f"Réservation {r.id} confirmée et emprunt créé (ID: {emprunt.id_emprunt})")
                 enregistrer_action(
                     acteur=r.matricule_user,
@@ -246,20 +422,20 @@ class GestionReservation:
         else:
             r.confirmer()
             self._retirer_de_file(r.isbn, id_reservation)
-            self.sauvegarder()
+            self._enregistrer_modification(r)
             return True
 
     def get_reservation(self, id_reservation: str) -> Optional[Reservation]:
         return self._reservations.get(id_reservation)
 
     def lister_par_user(self, matricule_user: str) -> List[Reservation]:
-        return [r for r in self._reservations.values() if r.matricule_user == matricule_user]
+        return list(self._par_user.get(matricule_user, {}).values())
 
     def lister_toutes(self) -> List[Reservation]:
         return list(self._reservations.values())
 
     def lister_file_pour_isbn(self, isbn: str) -> List[Reservation]:
-        ids = self._files.get(isbn, [])
+        ids = self._ids_file(isbn)
         return [
             self._reservations[i] for i in ids
             if i in self._reservations and self._reservations[i].statut == Reservation.STATUT_EN_ATTENTE
@@ -5,23 +5,29 @@ persistance dans `data/users.json` ainsi que quelques utilitaires
 affichage pour la CLI.
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from models.user import User    
 from models.enums import TypeUtilisateur
 import os
 import json
-import shutil
 from services.journal import enregistrer_action
 
 # Chemins
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 DATA_FILE = os.path.join(DATA_DIR, 'users.json')
+# Le dossier de données est créé une fois, au chargement du module
+os.makedirs(DATA_DIR, exist_ok=True)
 
 
 class GestionUtilisateur:
     def __init__(self):
         self._utilisateurs: List[User] = []
+        # Index par matricule et par email (le premier utilisateur l'emporte en cas de doublon)
+        self._par_matricule: Dict[str, User] = {}
+        self._par_email: Dict[str, User] = {}
+        # Incrémenté à chaque modification des utilisateurs
+        self._version = 0
         self.__charger()
 
     def __charger(self) -> None:
@@ -80,6 +86,8 @@ class GestionUtilisateur:
 
                 u.restaurer_etat(d)
                 self._utilisateurs.append(u)
+                self._par_matricule.setdefault(u.matricule, u)
+                self._par_email.setdefault(u.email, u)
 
             except Exception as e:
                 email_debug = d.get('email', 'inconnu')
@@ -89,6 +97,9 @@ class GestionUtilisateur:
     def recharger(self) -> None:
         """Relit le fichier JSON et remplace la liste courante."""
         self._utilisateurs.clear()
+        self._par_matricule.clear()
+        self._par_email.clear()
+        self._version += 1
         self.__charger()
 
     # ---------------- CREATION ----------------
@@ -117,6 +128,8 @@ class GestionUtilisateur:
             type_utilisateur=type_utilisateur
         )
         self._utilisateurs.append(utilisateur)
+        self._par_matricule[utilisateur.matricule] = utilisateur
+        self._par_email[utilisateur.email] = utilisateur
         self.sauvegarder()
 
         enregistrer_action(
@@ -139,6 +152,7 @@ class GestionUtilisateur:
         if utilisateur is None:
             return False
         self._utilisateurs.remove(utilisateur)
+        self._reindexer()
         self.sauvegarder()
 
         enregistrer_action(
@@ -152,24 +166,36 @@ class GestionUtilisateur:
     # ---------------- VERIFICATIONS ----------------
 
     def email_existe(self, email: str) -> bool:
-        return any(u.email == email for u in self._utilisateurs)
+        return self.get_utilisateur_par_email(email) is not None
 
     def matricule_existe(self, matricule: str) -> bool:
-        return any(u.matricule == matricule for u in self._utilisateurs)
+        return matricule in self._par_matricule
 
     # ---------------- RECHERCHE ----------------
 
     def get_utilisateur_par_matricule(self, matricule: str) -> Optional[User]:
-        for utilisateur in self._utilisateurs:
-            if utilisateur.matricule == matricule:
-                return utilisateur
-        return None
+        return self._par_matricule.get(matricule)
+
+    def utilisateurs_par_matricule(self) -> Dict[str, User]:
+        """Retourne l'index {matricule: utilisateur} pour les jointures en masse.
+
+        L'index est partagé : il est à consulter en lecture seule.
+        """
+        return self._par_matricule
 
     def get_utilisateur_par_email(self, email: str) -> Optional[User]:
-        for utilisateur in self._utilisateurs:
-            if utilisateur.email == email:
-                return utilisateur
-        return None
+        utilisateur = self._par_email.get(email)
+        # L'email est modifiable : une entrée qui ne correspond plus déclenche une reconstruction
+        if utilisateur is not None and utilisateur.email != email:
+            self._reindexer()
+            utilisateur = self._par_email.get(email)
+        return utilisateur
+
+    def _reindexer(self) -> None:
+        """Reconstruit les index par matricule et par email à partir de la liste."""
+        utilisateurs = list(reversed(self._utilisateurs))
+        self._par_matricule = {u.matricule: u for u in utilisateurs}
+        self._par_email = {u.email: u for u in utilisateurs}
 
     # ---------------- ACTIONS ----------------
 
@@ -224,13 +250,21 @@ class GestionUtilisateur:
     def data_format(self) -> List[dict]:
         return [u.data_format() for u in self._utilisateurs]
     
+    @property
+    def version(self) -> int:
+        """Compteur incrémenté à chaque modification des utilisateurs."""
+        return self._version
+
     def sauvegarder(self) -> None:
         """Persiste la liste d'utilisateurs sur disque de manière sûre.
 
         Écrit d'abord dans un fichier temporaire puis déplace le fichier
         pour éviter la corruption en cas d'erreur d'écriture.
         """
-        os.makedirs(DATA_DIR, exist_ok=True)
+        # Toute modification est suivie d'une sauvegarde : on compte une nouvelle version
+        self._version += 1
+        # Un email a pu être modifié directement sur l'objet User : l'index est rafraîchi
+        self._par_email = {u.email: u for u in reversed(self._utilisateurs)}
         temp_file = DATA_FILE + ".tmp"
         try:
             with open(temp_file, "w", encoding="utf-8") as f:
@@ -240,7 +274,9 @@ class GestionUtilisateur:
                     indent=4,
                     ensure_ascii=False
                 )
-            shutil.move(temp_file, DATA_FILE)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, DATA_FILE)
         except Exception as e:
             if os.path.exists(temp_file):
                 os.remove(temp_file)
@@ -4,10 +4,18 @@
 Fournit une fonction simple `enregistrer_action` pour écrire des
 entrées structurées dans un fichier de log situé dans
 `data/logs/systeme.log`.
+
+Les entrées sont déposées dans une file et écrites dans le fichier par
+un thread d'arrière-plan : l'appelant ne fait aucune entrée/sortie
+disque. `vider_journal` attend que la file soit entièrement écrite ; la
+file est aussi vidée à la fermeture du programme.
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
 from typing import Optional
 
@@ -20,10 +28,36 @@ os.makedirs(LOG_DIR, exist_ok=True)
 
 LOG_FILE = os.path.join(LOG_DIR, "systeme.log")
 
+# Niveaux acceptés par `enregistrer_action` (tout autre libellé vaut INFO)
+NIVEAUX = {
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+
+
+class _FileAttenteBrute(logging.handlers.QueueHandler):
+    """QueueHandler qui dépose l'enregistrement tel quel, sans le mettre en forme.
+
+    `QueueHandler.prepare` formate le message dans le thread appelant ; ici
+    l'enregistrement garde son gabarit et ses arguments, et la mise en forme
+    complète est faite par le `Formatter` du fichier, dans le thread de
+    l'écouteur. Les entrées du journal ne portent pas d'exception
+    (`exc_info`), seul cas où le formatage préalable est nécessaire.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
 # Configuration du logger
 logger = logging.getLogger("Bibliotheque")
 logger.setLevel(logging.INFO)
 
+# Thread d'écriture du fichier de log (None tant que le logger n'est pas configuré ici)
+_ecouteur: Optional[logging.handlers.QueueListener] = None
+
 # Évite les duplications si le module est rechargé
 if not logger.handlers:
     # Handler fichier (avec rotation quotidienne si besoin)
@@ -33,7 +67,15 @@ if not logger.handlers:
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
+
+    # Le logger ne fait que déposer les entrées dans la file ;
+    # l'écouteur les écrit dans le fichier depuis son propre thread.
+    file_log: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    logger.addHandler(_FileAttenteBrute(file_log))
+    _ecouteur = logging.handlers.QueueListener(file_log, file_handler, respect_handler_level=True)
+    _ecouteur.start()
+    # Enregistré après logging : l'écouteur est arrêté (file vidée) avant logging.shutdown
+    atexit.register(_ecouteur.stop)
 
 
 def enregistrer_action(
@@ -48,13 +90,18 @@ def enregistrer_action(
     Le message est formaté de manière compacte et envoyé au logger
     configuré. `niveau` peut être "INFO", "WARNING" ou "ERROR".
     """
-    message = f"{acteur} | {action} | {cible}"
+    niveau_log = NIVEAUX.get(niveau, logging.INFO)
+    # Le message n'est mis en forme qu'au moment de l'écriture, et jamais s'il est filtré
     if details:
-        message += f" | {details}"
-    
-    if niveau == "ERROR":
-        logger.error(message)
-    elif niveau == "WARNING":
-        logger.warning(message)
+        logger.log(niveau_log, "%s | %s | %s | %s", acteur, action, cible, details)
     else:
-        logger.info(message)
\ No newline at end of file
+        logger.log(niveau_log, "%s | %s | %s", acteur, action, cible)
+
+
+def vider_journal() -> None:
+    """Attend que toutes les entrées en file soient écrites dans le fichier."""
+    if _ecouteur is None:
+        return
+    # stop() dépose une sentinelle et attend que le thread ait tout écrit
+    _ecouteur.stop()
+    _ecouteur.start()
@@ -0,0 +1,26 @@
+"""Registre partagé des gestionnaires.
+
+Les gestionnaires de livres, d'utilisateurs, d'emprunts et de
+réservations ont besoin les uns des autres. Plutôt que de compléter
+leurs références après coup, chacun reçoit le même objet `Services`
+et y retrouve les autres gestionnaires une fois enregistrés.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from services.gestion_livre import GestionLivre
+    from services.gestion_user import GestionUtilisateur
+    from services.gestion_emprunt import GestionEmprunt
+    from services.gestion_reservation import GestionReservation
+
+
+@dataclass(slots=True)
+class Services:
+    """Références vers les gestionnaires de l'application (absentes tant qu'ils ne sont pas créés)."""
+
+    livre: Optional['GestionLivre'] = None
+    user: Optional['GestionUtilisateur'] = None
+    emprunt: Optional['GestionEmprunt'] = None
+    reservation: Optional['GestionReservation'] = None
@@ -6,8 +6,9 @@ l'exportation dans un fichier.
 """
 
 from collections import Counter
-from typing import List, Dict, Tuple
+from typing import List, Dict, NamedTuple, Optional, Set, Tuple
 from models.livre import Livre
+from models.enums import StatutLivre
 from models.user import User
 from services.gestion_livre import GestionLivre
 from services.gestion_emprunt import GestionEmprunt
@@ -19,6 +20,35 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 STATS_FILE = os.path.join(DATA_DIR, 'stats')
 
+# Statuts détaillés dans l'état de l'inventaire (les autres ne comptent que dans le total)
+_STATUTS_INVENTAIRE = (
+    StatutLivre.DISPONIBLE,
+    StatutLivre.EMPRUNTE,
+    StatutLivre.RESERVE,
+    StatutLivre.PERDU,
+    StatutLivre.ENDOMMAGE,
+)
+
+# Dossiers d'export déjà créés pendant cette exécution
+_dossiers_crees: Set[str] = set()
+
+# Largeur des bandeaux de section du rapport texte
+LARGEUR_RAPPORT = 70
+
+
+def _entete(titre: str) -> str:
+    """Bandeau de section du rapport : titre centré entre deux lignes de `=`."""
+    separateur = "=" * LARGEUR_RAPPORT
+    return f"{separateur}\n{titre.center(LARGEUR_RAPPORT)}\n{separateur}\n"
+
+
+class _Agregats(NamedTuple):
+    """Agrégats sur l'historique des emprunts, calculés en un seul parcours."""
+    total_emprunts: int
+    par_isbn: Counter
+    par_matricule: Counter
+    isbns_empruntes: Set[str]
+
 
 class Statistiques:
     """Génère des rapports statistiques à partir des données de la bibliothèque."""
@@ -28,139 +58,154 @@ class Statistiques:
         self._gestion_livre = gestion_livre
         self._gestion_emprunt = gestion_emprunt
         self._gestion_user = gestion_user
+        # Agrégats mémorisés avec la version des emprunts qui les a produits
+        self._agregats: Optional[_Agregats] = None
+        self._version_agregats: Optional[int] = None
+        # Livres jamais empruntés, mémorisés avec les versions (emprunts, catalogue) d'origine
+        self._jamais_empruntes: Optional[List[Livre]] = None
+        self._versions_jamais: Optional[Tuple[int, int]] = None
+
+    def _agreger(self) -> _Agregats:
+        """Compte les emprunts par ISBN et par matricule en un seul parcours.
+
+        Le résultat est réutilisé tant que `GestionEmprunt.version` n'a pas changé.
+        """
+        version = self._gestion_emprunt.version
+        if self._agregats is None or self._version_agregats != version:
+            par_isbn: Counter = Counter()
+            par_matricule: Counter = Counter()
+            total = 0
+            for e in self._gestion_emprunt.lister_tous():
+                par_isbn[e.isbn] += 1
+                par_matricule[e.matricule_user] += 1
+                total += 1
+            self._agregats = _Agregats(total, par_isbn, par_matricule, set(par_isbn))
+            self._version_agregats = version
+        return self._agregats
 
     def etat_inventaire(self) -> Dict[str, int]:
         """Retourne le nombre de livres par statut."""
-        compteur = {
-            "disponible": 0,
-            "emprunte": 0,
-            "reserve": 0,
-            "perdu": 0,
-            "endommage": 0,
-            "total": 0
-        }
-
-        for livre in self._gestion_livre.lister_livres():
-            for ex in livre.exemplaires:
-                compteur["total"] += 1
-                statut = ex.statut
-                if statut in compteur:
-                    compteur[statut] += 1
+        # Une seule réduction (Counter, en C) sur l'enum, sans passer par la chaîne du statut
+        par_statut = Counter(
+            ex.statut_enum
+            for livre in self._gestion_livre.lister_livres()
+            for ex in livre.iter_exemplaires()
+        )
+        compteur = {statut.value: par_statut[statut] for statut in _STATUTS_INVENTAIRE}
+        compteur["total"] = sum(par_statut.values())
         return compteur
 
     def total_emprunts(self) -> int:
         """Nombre total d'emprunts (historique complet)."""
-        return len(self._gestion_emprunt.lister_tous())
+        return self._agreger().total_emprunts
 
     def livres_jamais_empruntes(self) -> List[Livre]:
-        """Liste des livres qui n'ont jamais été empruntés."""
-        emprunts = self._gestion_emprunt.lister_tous()
-        isbns_empruntes = {e.isbn for e in emprunts}
-        livres = self._gestion_livre.lister_livres()
-        return [livre for livre in livres if livre.isbn not in isbns_empruntes]
+        """Liste des livres qui n'ont jamais été empruntés, dans l'ordre du catalogue.
+
+        La liste est recalculée seulement si les emprunts ou le catalogue ont
+        changé ; elle est partagée et donc à consulter en lecture seule.
+        """
+        versions = (self._gestion_emprunt.version, self._gestion_livre.version)
+        if self._jamais_empruntes is None or self._versions_jamais != versions:
+            isbns_empruntes = self._agreger().isbns_empruntes
+            livres = self._gestion_livre.lister_livres()
+            self._jamais_empruntes = [livre for livre in livres if livre.isbn not in isbns_empruntes]
+            self._versions_jamais = versions
+        return self._jamais_empruntes
 
     def top_livres_empruntes(self, n: int = 5) -> List[Tuple[str, int]]:
         """Top N des livres les plus empruntés (ISBN, nombre d'emprunts)."""
-        emprunts = self._gestion_emprunt.lister_tous()
-        compteur = Counter(e.isbn for e in emprunts)
-        return compteur.most_common(n)
+        return self._agreger().par_isbn.most_common(n)
 
     def top_utilisateurs_actifs(self, n: int = 5) -> List[Tuple[str, int]]:
         """Top N des utilisateurs les plus actifs (matricule, nombre d'emprunts)."""
-        emprunts = self._gestion_emprunt.lister_tous()
-        compteur = Counter(e.matricule_user for e in emprunts)
-        return compteur.most_common(n)
+        return self._agreger().par_matricule.most_common(n)
 
     def generer_rapport_texte(self) -> str:
         """Génère un rapport textuel complet avec mise en forme alignée."""
-        from io import StringIO
-        output = StringIO()
-        width = 70
+        parts: List[str] = []
+        add = parts.append
+        separateur = "=" * LARGEUR_RAPPORT
 
         # === ÉTAT DE L'INVENTAIRE ===
-        output.write("=" * width + "\n")
-        output.write(" ÉTAT DE L'INVENTAIRE".center(width) + "\n")
-        output.write("=" * width + "\n")
+        add(_entete(" ÉTAT DE L'INVENTAIRE"))
         etat = self.etat_inventaire()
-        output.write(f"{'Statut':<15} | {'Quantité':<10}\n")
-        output.write("-" * 30 + "\n")
-        output.write(f"{'Total':<15} | {etat['total']:<10}\n")
-        output.write(f"{'Disponible':<15} | {etat['disponible']:<10}\n")
-        output.write(f"{'Emprunté':<15} | {etat['emprunte']:<10}\n")
-        output.write(f"{'Réservé':<15} | {etat['reserve']:<10}\n")
-        output.write(f"{'Perdu':<15} | {etat['perdu']:<10}\n")
-        output.write(f"{'Endommagé':<15} | {etat['endommage']:<10}\n")
+        add(
+            f"{'Statut':<15} | {'Quantité':<10}\n"
+            f"{'-' * 30}\n"
+            f"{'Total':<15} | {etat['total']:<10}\n"
+            f"{'Disponible':<15} | {etat['disponible']:<10}\n"
+            f"{'Emprunté':<15} | {etat['emprunte']:<10}\n"
+            f"{'Réservé':<15} | {etat['reserve']:<10}\n"
+            f"{'Perdu':<15} | {etat['perdu']:<10}\n"
+            f"{'Endommagé':<15} | {etat['endommage']:<10}\n"
+        )
 
         # === ACTIVITÉ GLOBALE ===
-        output.write("\n" + "=" * width + "\n")
-        output.write(" ACTIVITÉ GLOBALE".center(width) + "\n")
-        output.write("=" * width + "\n")
-        total_emprunts = self.total_emprunts()
-        output.write(f"• Total des emprunts (historique) : {total_emprunts}\n")
+        add("\n" + _entete(" ACTIVITÉ GLOBALE"))
+        add(f"• Total des emprunts (historique) : {self.total_emprunts()}\n")
 
         # === LIVRES JAMAIS EMPRUNTÉS ===
-        output.write("\n" + "=" * width + "\n")
-        output.write(" LIVRES JAMAIS EMPRUNTÉS".center(width) + "\n")
-        output.write("=" * width + "\n")
+        add("\n" + _entete(" LIVRES JAMAIS EMPRUNTÉS"))
         livres_jamais = self.livres_jamais_empruntes()
         if livres_jamais:
-            output.write(f"Nombre : {len(livres_jamais)}\n")
+            add(f"Nombre : {len(livres_jamais)}\n")
             for livre in livres_jamais[:10]:
-                output.write(f"  → {livre.titre} ({livre.isbn})\n")
+                add(f"  → {livre.titre} ({livre.isbn})\n")
         else:
-            output.write("Aucun livre n'est resté sans emprunt.\n")
+            add("Aucun livre n'est resté sans emprunt.\n")
 
         # === TOP LIVRES ===
-        output.write("\n" + "=" * width + "\n")
-        output.write(" TOP 5 DES LIVRES LES PLUS EMPRUNTÉS".center(width) + "\n")
-        output.write("=" * width + "\n")
+        add("\n" + _entete(" TOP 5 DES LIVRES LES PLUS EMPRUNTÉS"))
         top_livres = self.top_livres_empruntes()
         if top_livres:
-            output.write(f"{'Rang':<6} {'Titre':<30} {'Emprunts':<10}\n")
-            output.write("-" * 60 + "\n")
+            add(f"{'Rang':<6} {'Titre':<30} {'Emprunts':<10}\n{'-' * 60}\n")
+            livres_par_isbn = self._gestion_livre.livres_par_isbn()
             for i, (isbn, count) in enumerate(top_livres, 1):
-                livre = self._gestion_livre.get_livre(isbn)
+                livre = livres_par_isbn.get(isbn)
                 titre = (livre.titre if livre else isbn)[:28]
-                output.write(f"{i:<6} {titre:<30} {count:<10}\n")
+                add(f"{i:<6} {titre:<30} {count:<10}\n")
         else:
-            output.write("Aucun emprunt enregistré.\n")
+            add("Aucun emprunt enregistré.\n")
 
         # === TOP UTILISATEURS ===
-        output.write("\n" + "=" * width + "\n")
-        output.write(" TOP 5 DES UTILISATEURS LES PLUS ACTIFS".center(width) + "\n")
-        output.write("=" * width + "\n")
+        add("\n" + _entete(" TOP 5 DES UTILISATEURS LES PLUS ACTIFS"))
         top_users = self.top_utilisateurs_actifs()
         if top_users:
-            output.write(f"{'Rang':<6} {'Nom':<30} {'Emprunts':<10}\n")
-            output.write("-" * 60 + "\n")
+            add(f"{'Rang':<6} {'Nom':<30} {'Emprunts':<10}\n{'-' * 60}\n")
+            users_par_matricule = self._gestion_user.utilisateurs_par_matricule()
             for i, (matricule, count) in enumerate(top_users, 1):
-                user = self._gestion_user.get_utilisateur_par_matricule(matricule)
+                user = users_par_matricule.get(matricule)
                 nom = (user.nom_complet() if user else matricule)[:28]
-                output.write(f"{i:<6} {nom:<30} {count:<10}\n")
+                add(f"{i:<6} {nom:<30} {count:<10}\n")
         else:
-            output.write("Aucun emprunt enregistré.\n")
+            add("Aucun emprunt enregistré.\n")
 
-        output.write("\n" + "=" * width + "\n")
-        return output.getvalue()
+        add(f"\n{separateur}\n")
+        return "".join(parts)
     
 
-    def exporter(self, dossier: str = STATS_FILE) -> str:
+    def exporter(self, dossier: str = STATS_FILE, contenu: Optional[str] = None) -> str:
         """
         Exporte le rapport statistique dans un fichier texte horodaté.
         
         :param dossier: Chemin du dossier de destination
+        :param contenu: Rapport déjà généré à écrire (généré ici si absent)
         :return: Chemin absolu du fichier créé
         """
-        # Créer le dossier s'il n'existe pas
-        os.makedirs(dossier, exist_ok=True)
+        # Créer le dossier s'il n'existe pas (une seule fois par dossier)
+        if dossier not in _dossiers_crees:
+            os.makedirs(dossier, exist_ok=True)
+            _dossiers_crees.add(dossier)
         
         # Générer un nom de fichier unique
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         nom_fichier = f"rapport_biblio_{timestamp}.txt"
         chemin = os.path.join(dossier, nom_fichier)
         
-        # Générer et écrire le rapport
-        contenu = self.generer_rapport_texte()
+        # Générer (si besoin) et écrire le rapport
+        if contenu is None:
+            contenu = self.generer_rapport_texte()
         with open(chemin, "w", encoding="utf-8") as f:
             f.write(contenu)
         
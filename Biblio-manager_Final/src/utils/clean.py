@@ -1,10 +1,38 @@
 # validation de  donnees et nettoyage des entrees utilisateur
 from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
 from typing import Optional
+from operator import mul
+import time
 import uuid
 import re
 
 
+# Motif des emails, compilé une seule fois au chargement du module
+_EMAIL_RE = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+
+# Séparateurs ignorés dans un ISBN ou un numéro de téléphone, retirés en un seul passage par str.translate
+_SEPARATEURS = str.maketrans("", "", "- ")
+
+# Poids des neuf premiers chiffres d'un ISBN-10 (la clé a le poids 1)
+_POIDS_ISBN10 = (10, 9, 8, 7, 6, 5, 4, 3, 2)
+
+# Année courante mémorisée pour valider_annee, relue au plus une fois par heure
+DUREE_CACHE_ANNEE = 3600  # secondes
+_annee_courante = datetime.now().year
+_annee_lue_a = time.monotonic()
+
+# Statuts d'exemplaire acceptés par valider_statut
+_STATUTS_VALIDES = frozenset(("disponible", "emprunte", "perdu", "endommage", "reserve"))
+
+# Attributs attendus par valider_exemplaire et valider_livre
+_ATTRIBUTS_EXEMPLAIRE = ('id_exemplaire', 'code_barre', 'etat', 'localisation', 'statut', 'date_acquisition')
+_ATTRIBUTS_LIVRE = (
+    'isbn', 'titre', 'auteur', 'editeur', 'annee_publication', 'categorie', 'mots_cles',
+    'exemplaires', 'nombre_exemplaires', 'exemplaires_disponibles', 'statut', 'compteur_emprunts',
+)
+
 
 def nettoyer_chaine(chaine: Optional[str]) -> Optional[str]:
 
@@ -13,104 +41,82 @@ def nettoyer_chaine(chaine: Optional[str]) -> Optional[str]:
     return chaine
 
 
+# Résultat mémorisé par ISBN : un même ISBN est revalidé à chaque création ou modification de livre
+@lru_cache(maxsize=4096)
 def valider_isbn(isbn: str) -> bool:
     
-    isbn = isbn.replace("-", "")
-    isbn = isbn.replace(" ", "")
+    isbn = isbn.translate(_SEPARATEURS)
 
     # Verification du format de l'ISBN - 10
     if len(isbn) == 10:
-        
-        if 'X' in isbn and isbn[-1] != 'X':
+        # Neuf chiffres puis une clé : chiffre ou 'X' (valeur 10), seulement en dernière position
+        corps, cle = isbn[:9], isbn[9]
+        if not corps.isdigit():
+            return False
+        if cle == 'X':
+            valeur_cle = 10
+        elif cle.isdigit():
+            valeur_cle = int(cle)
+        else:
             return False
-        
-        total = 0
-
-        for i in range(10):
-            caractere = isbn[i]
-
-            if caractere == 'X':
-                valeur = 10
-            else:
-                
-                if not caractere.isdigit():
-                    return False
-                valeur = int(caractere)
 
-            poids = 10 - i
-            total = total + poids * valeur
+        total = sum(map(mul, _POIDS_ISBN10, map(int, corps))) + valeur_cle
 
         return total % 11 == 0
 
     # Vérification du format de l'ISBN - 13
     elif len(isbn) == 13:
-        total = 0
-
-        for i in range(13):
-            if not isbn[i].isdigit():
-                return False
-
-            chiffre = int(isbn[i])
-
-            if i % 2 == 0:
-                poids = 1
-            else:
-                poids = 3
+        if not isbn.isdigit():
+            return False
 
-            total = total + poids * chiffre
+        # Poids 1 sur les positions paires, 3 sur les impaires
+        total = sum(map(int, isbn[0::2])) + 3 * sum(map(int, isbn[1::2]))
 
         return total % 10 == 0
     else:
         return False
 
+def annee_courante() -> int:
+    """Année en cours, sans relire l'horloge à chaque validation."""
+    global _annee_courante, _annee_lue_a
+    maintenant = time.monotonic()
+    if maintenant - _annee_lue_a > DUREE_CACHE_ANNEE:
+        _annee_courante = datetime.now().year
+        _annee_lue_a = maintenant
+    return _annee_courante
+
 def valider_annee(annee: int) -> bool:
-    return 0 < annee <= datetime.now().year
+    return 0 < annee <= annee_courante()
 
 def valider_mots_cles(mots_cles: Optional[list]) -> bool:
-    if mots_cles is None:
-        return True
-    if not isinstance(mots_cles, list):
-        return False
-    for mot in mots_cles:
-        if not isinstance(mot, str):
-            return False
-    return True
+    return valider_liste_chaines(mots_cles)
 
 def valider_date(date: datetime) -> bool:
-    if not isinstance(date, datetime):
-        return False
-    if date > datetime.now():
-        return False
-    return True
+    return isinstance(date, datetime) and date <= datetime.now()
 
 def valider_expl_dispo(nombre_exemplaires: int, exemplaires_disponibles: int) -> bool:
-    if not isinstance(nombre_exemplaires, int) or not isinstance(exemplaires_disponibles, int):
-        return False
-    if nombre_exemplaires < 0 or exemplaires_disponibles < 0:
-        return False
-    if exemplaires_disponibles > nombre_exemplaires:
-        return False
-    return True
+    return (
+        isinstance(nombre_exemplaires, int)
+        and isinstance(exemplaires_disponibles, int)
+        and 0 <= exemplaires_disponibles <= nombre_exemplaires
+    )
 
 def generer_id_exemplaire() -> str:
     return str(uuid.uuid4())
 
 def valider_statut(statut: str) -> bool:
-    statuts_valides = ["disponible", "emprunte", "perdu", "endommage", "reserve"]
-    return statut in statuts_valides
+    try:
+        return statut in _STATUTS_VALIDES
+    except TypeError:
+        # Valeur non hachable : ce n'est pas un statut
+        return False
 
 def valider_compteur_emprunts(compteur: int) -> bool:
     return isinstance(compteur, int) and compteur >= 0
 
 def valider_liste_chaines(liste: Optional[list]) -> bool:
-    if liste is None:
-        return True
-    if not isinstance(liste, list):
-        return False
-    for item in liste:
-        if not isinstance(item, str):
-            return False
-    return True
+    # Parcours entièrement en C, arrêté au premier élément qui n'est pas une chaîne
+    return liste is None or (isinstance(liste, list) and all(map(isinstance, liste, repeat(str))))
 
 def est_entier(valeur) -> bool:
     return isinstance(valeur, int)
@@ -122,21 +128,19 @@ def est_flottant(valeur) -> bool:
     return isinstance(valeur, float)
 
 def valider_exemplaire(exemplaire) -> bool:
-    required_attrs = ['id_exemplaire', 'code_barre', 'etat', 'localisation', 'statut', 'date_acquisition']
-    for attr in required_attrs:
+    for attr in _ATTRIBUTS_EXEMPLAIRE:
         if not hasattr(exemplaire, attr):
             return False
     return True
 
 def valider_livre(livre) -> bool:
-    required_attrs = ['isbn', 'titre', 'auteur', 'editeur', 'annee_publication', 'categorie', 'mots_cles', 'exemplaires', 'nombre_exemplaires', 'exemplaires_disponibles', 'statut', 'compteur_emprunts']
-    for attr in required_attrs:
+    for attr in _ATTRIBUTS_LIVRE:
         if not hasattr(livre, attr):
             return False
     return True
 
 def valider_code_barre(code_barre: str) -> bool:
-    return nettoyer_chaine(code_barre) is not None and len(code_barre) == 5
+    return isinstance(code_barre, str) and len(code_barre) == 5
 
 
 # ------------------------- Clean user information -------------------------
@@ -148,14 +152,16 @@ def valider_email(email: str) -> bool:
     - doit contenir un @
     - nom de domaine valide
     """
-    if not isinstance(email, str) or not email.strip():
+    if not isinstance(email, str):
         return False
-    
-    email = email.strip()
-    
-    # Regex simple et robuste
-    pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-    return bool(re.match(pattern, email))
+    return _email_valide(email.strip())
+
+
+@lru_cache(maxsize=2048)
+def _email_valide(email: str) -> bool:
+    """Résultat mémorisé par email nettoyé : la regex ne tourne qu'une fois par adresse."""
+    # Regex simple et robuste (voir _EMAIL_RE)
+    return bool(email) and _EMAIL_RE.match(email) is not None
 
 
 def valider_telephone(telephone: str) -> bool:
@@ -165,16 +171,18 @@ def valider_telephone(telephone: str) -> bool:
     - longueur 8 à 12 chiffres
     - optionnel : peut commencer par 0 ou 00229 (Bénin)
     """
-    if not isinstance(telephone, str) or not telephone.strip():
+    if not isinstance(telephone, str):
         return False
 
-    tel = telephone.strip()
+    # Supprimer les espaces et tirets : "01 23 45 67" et "01234567" partagent une entrée du cache
+    return _telephone_valide(telephone.strip().translate(_SEPARATEURS))
 
-    # Supprimer les espaces et tirets
-    tel = tel.replace(" ", "").replace("-", "")
 
-    # Vérifier format
-    if not tel.isdigit():
+@lru_cache(maxsize=2048)
+def _telephone_valide(tel: str) -> bool:
+    """Résultat mémorisé par numéro nettoyé (chiffres seuls attendus)."""
+    # Vérifier format : chiffres ASCII uniquement (isascii est immédiat sur une chaîne ASCII)
+    if not (tel.isascii() and tel.isdigit()):
         return False
 
     # Vérifier longueur
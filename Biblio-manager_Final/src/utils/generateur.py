@@ -1,8 +1,20 @@
-import random
+import atexit
 import string
 import os
+from typing import Optional, TextIO
 
 FICHIER_IDS = "ids_book.txt"
+ALPHABET_IDS = string.ascii_uppercase + string.digits
+
+# Octet aléatoire -> caractère de ALPHABET_IDS, pour tirer un code entier avec bytes.translate
+# (256 n'étant pas multiple de 36, les premiers caractères sont très légèrement favorisés)
+_TABLE_IDS = bytes(ord(ALPHABET_IDS[b % len(ALPHABET_IDS)]) for b in range(256))
+
+# IDs déjà attribués, lus une seule fois dans FICHIER_IDS puis tenus à jour en mémoire
+_ids_connus = None
+
+# FICHIER_IDS ouvert en ajout au premier ID enregistré, puis gardé ouvert
+_fichier_ids: Optional[TextIO] = None
 
 def charger_ids() -> set:
     if not os.path.exists(FICHIER_IDS):
@@ -11,17 +23,22 @@ def charger_ids() -> set:
         return set(line.strip() for line in f.readlines())
 
 def enregistrer_id(nouvel_id: str):
-    with open(FICHIER_IDS, "a") as f:
-        f.write(nouvel_id + "\n")
+    global _fichier_ids
+    if _fichier_ids is None:
+        # Tampon par ligne : chaque ID est écrit aussitôt, sans réouvrir le fichier
+        _fichier_ids = open(FICHIER_IDS, "a", buffering=1)
+        atexit.register(_fichier_ids.close)
+    _fichier_ids.write(nouvel_id + "\n")
 
 def generer_id_unique(prefix: str, longueur: int = 8) -> str:
-    existing_ids = charger_ids()
-    alphabet = string.ascii_uppercase + string.digits
+    global _ids_connus
+    if _ids_connus is None:
+        _ids_connus = charger_ids()
 
     while True:
-        code = ''.join(random.choice(alphabet) for _ in range(longueur))
+        code = os.urandom(longueur).translate(_TABLE_IDS).decode("ascii")
         new_id = f"{prefix}-{code}"
-        if new_id not in existing_ids:
+        if new_id not in _ids_connus:
+            _ids_connus.add(new_id)
             enregistrer_id(new_id)
             return new_id
-